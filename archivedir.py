@@ -1,4 +1,5 @@
 import os
+import re
 import sys
 import tarfile
 import zlib
@@ -8,7 +9,8 @@ import shutil
 import threading
 from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from fnmatch import fnmatch
+from fnmatch import fnmatch, translate
+from functools import lru_cache
 
 # ================= OPTIONAL IMPORTS =================
 try:
@@ -164,6 +166,46 @@ class ParallelGzipWriter:
 
 # ================= CORE LOGIC =================
 
+def normalize_source_pattern(source_pattern):
+    """Turn one part (file.part_000) or an archive name into a pattern for all its parts."""
+    if "*" not in source_pattern:
+        if "part_" in source_pattern:
+            # Handle patterns like /path/file.part_000 -> /path/file.part_*
+            base = source_pattern.split("part_")[0]
+            source_pattern = base + "part_*"
+        elif source_pattern.endswith(".tar.gz"):
+            # Check if it's actually a split file with .part_000 extension
+            potential_part = source_pattern + ".part_000"
+            if os.path.exists(potential_part):
+                source_pattern = source_pattern + ".part_*"
+    return source_pattern
+
+@lru_cache(maxsize=64)
+def _name_matcher(name_pattern):
+    """Compiled regex for a file name glob (kept across calls)."""
+    return re.compile(translate(name_pattern))
+
+def find_parts(source_pattern):
+    """
+    Sorted paths matching source_pattern, like sorted(glob.glob(...)).
+    A wildcard in the file name only is matched against one os.scandir listing
+    with a compiled regex; wildcards in the directory part still go to glob.
+    """
+    dirname, name = os.path.split(source_pattern)
+    if glob.has_magic(dirname):
+        return sorted(glob.glob(source_pattern))
+    if not glob.has_magic(name):
+        return [source_pattern] if os.path.lexists(source_pattern) else []
+    
+    matcher = _name_matcher(name)
+    hidden = name.startswith('.')  # glob skips dot files unless asked for them
+    try:
+        with os.scandir(dirname or '.') as entries:
+            return sorted(os.path.join(dirname, entry.name) for entry in entries
+                          if matcher.match(entry.name) and (hidden or not entry.name.startswith('.')))
+    except OSError:
+        return []
+
 def get_fs_limit(path):
     """Check for FAT32 and return safe size limit."""
     if not psutil: return None
@@ -364,7 +406,7 @@ def run_backup(args):
 
 class MultiPartFileReader:
     def __init__(self, file_pattern, buffer_size=None):
-        self.files = sorted(glob.glob(file_pattern))
+        self.files = find_parts(file_pattern)
         if not self.files:
             raise FileNotFoundError("No split files found")
         self.current_idx = 0
@@ -427,16 +469,7 @@ def run_extract(args):
     source_pattern = args.source
     
     # Handle different input patterns
-    if "*" not in source_pattern:
-        if "part_" in source_pattern:
-            # Handle patterns like /path/file.part_000 -> /path/file.part_*
-            base = source_pattern.split("part_")[0]
-            source_pattern = base + "part_*"
-        elif source_pattern.endswith(".tar.gz"):
-            # Check if it's actually a split file with .part_000 extension
-            potential_part = source_pattern + ".part_000"
-            if os.path.exists(potential_part):
-                source_pattern = source_pattern + ".part_*"
+    source_pattern = normalize_source_pattern(source_pattern)
     
     print(f"🔍 Looking for files matching: {source_pattern}")
     
@@ -446,7 +479,7 @@ def run_extract(args):
 
     print(f"🧩 Extracting from: {source_pattern}")
     
-    files = sorted(glob.glob(source_pattern))
+    files = find_parts(source_pattern)
     if not files:
         print(f"❌ No files found matching pattern: {source_pattern}")
         return
@@ -819,20 +852,11 @@ def run_test_archive(args):
     source_pattern = args.source
     
     # Handle different input patterns
-    if "*" not in source_pattern:
-        if "part_" in source_pattern:
-            # Handle patterns like /path/file.part_000 -> /path/file.part_*
-            base = source_pattern.split("part_")[0]
-            source_pattern = base + "part_*"
-        elif source_pattern.endswith(".tar.gz"):
-            # Check if it's actually a split file with .part_000 extension
-            potential_part = source_pattern + ".part_000"
-            if os.path.exists(potential_part):
-                source_pattern = source_pattern + ".part_*"
+    source_pattern = normalize_source_pattern(source_pattern)
     
     print(f"🔍 Testing archive integrity: {source_pattern}")
     try:
-        files = sorted(glob.glob(source_pattern))
+        files = find_parts(source_pattern)
         if not files:
             print(f"❌ No files found matching pattern: {source_pattern}")
             return
@@ -9,19 +9,42 @@ Supports streaming backups to:
 - Google Drive (gs://folder or --cloud gdrive)
 - OneDrive (onedrive://folder or --cloud onedrive)
 
-Supports optional AES-256-CBC encryption via crypto.py module
+Supports optional AES-256-GCM encryption via crypto.py module
 """
 
 import os
 import sys
 import argparse
 import subprocess
-import glob
+import shutil
 import time
+import re
+import fnmatch
 import io
+import json
+import tempfile
+import http.client
+import errno
+import select
+import ctypes
+import ctypes.util
+import contextlib
+import threading
+import queue
+import collections
+import importlib.util
+import functools
+import itertools
+import string
+import concurrent.futures
 from pathlib import Path
 from urllib.parse import urlparse
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 # Try to import crypto module
 try:
     import crypto
@@ -38,27 +61,18 @@ except ImportError:
     config = None
     HAS_CONFIG = False
 
-# Optional cloud imports (loaded on demand)
-try:
-    import boto3
-    HAS_S3 = True
-except ImportError:
-    HAS_S3 = False
-
-try:
-    from google.oauth2.credentials import Credentials
-    from googleapiclient.discovery import build
-    from googleapiclient.http import MediaIoBaseUpload
-    HAS_GDRIVE = True
-except ImportError:
-    HAS_GDRIVE = False
+# Optional cloud SDKs (loaded on demand). Only their presence is checked here -
+# importing boto3 or the Google client costs hundreds of ms, so each is imported
+# by the code path that uses it and local backups/extracts never pay for them.
+def _has_module(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
 
-try:
-    from msal import PublicClientApplication
-    import requests
-    HAS_ONEDRIVE = True
-except ImportError:
-    HAS_ONEDRIVE = False
+HAS_S3 = _has_module('boto3')
+HAS_GDRIVE = _has_module('googleapiclient') and _has_module('google.oauth2')
+HAS_ONEDRIVE = _has_module('msal') and _has_module('requests')
 
 # Default exclusion patterns for problematic files
 DEFAULT_EXCLUSIONS = [
@@ -105,6 +119,16 @@ DEFAULT_EXCLUSIONS = [
     # "*.img"
 ]
 
+# Sizes worker pools and compressor threads (os.cpu_count() can return None)
+CPU_COUNT = os.cpu_count() or 4
+
+# Linux lets us grow pipe buffers (default 64KB) so producers can run ahead
+F_SETPIPE_SZ = getattr(fcntl, 'F_SETPIPE_SZ', 1031)
+PIPE_SIZE = 1024 * 1024  # 1MB
+
+# How far ahead of the feeder the kernel is asked to read archive parts on extract
+READAHEAD_SIZE = 16 * 1024 * 1024  # 16MB
+
 def run_command(cmd, capture_output=True, shell=True, check=True):
     """Run a bash command with proper error handling"""
     try:
@@ -150,15 +174,283 @@ def run_command(cmd, capture_output=True, shell=True, check=True):
         print()
         raise
 
-def check_dependencies():
-    """Check if required tools are available"""
-    tools = ['tar', 'gzip']
+def set_pipe_size(fd, size=PIPE_SIZE):
+    """Grow a pipe's kernel buffer (Linux only, silently ignored elsewhere)"""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return
+    try:
+        fcntl.fcntl(fd, F_SETPIPE_SZ, size)
+    except OSError:
+        pass  # Above /proc/sys/fs/pipe-max-size - keep the default
+
+# CPUs the process may use, read once: a feeder thread's own affinity is narrowed below
+PIPELINE_CPUS = frozenset(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else frozenset()
+# Cores held by active feeder_affinity blocks (one per feeding thread)
+_feeder_cpus = set()
+_feeder_lock = threading.Lock()
+
+def worker_cpus():
+    """CPUs for pipeline workers, or None when no feeder holds a core (nothing to split)"""
+    with _feeder_lock:
+        if not _feeder_cpus:
+            return None
+        return PIPELINE_CPUS - _feeder_cpus
+
+def tune_worker(pid):
+    """
+    Run a compressor/crypto child as a batch job off the feeders' cores
+    
+    SCHED_BATCH tells the Linux scheduler the process is CPU-bound throughput work
+    (longer time slices, no wakeup preemption of interactive tasks). Applied from
+    the parent after Popen rather than via preexec_fn, which is not thread-safe.
+    Affinity is only narrowed while a feeder_affinity block is active; without
+    a Python feeder (backups) children keep every core.
+    Best effort - silently skipped on other platforms.
+    """
+    cpus = worker_cpus()
+    try:
+        if cpus:
+            os.sched_setaffinity(pid, cpus)
+        if hasattr(os, 'SCHED_BATCH'):
+            os.sched_setscheduler(pid, os.SCHED_BATCH, os.sched_param(0))
+    except OSError:
+        pass  # Child already exited or not permitted
+
+@contextlib.contextmanager
+def feeder_affinity():
+    """
+    Pin the calling thread to a core of its own while it pumps data into a pipeline
     
-    # Check for gtar (GNU tar) - required for proper macOS support
+    Each concurrent feeder takes the lowest free core, as long as one is left for
+    the workers; otherwise it runs unpinned. Start the pipeline inside the block
+    so its children are kept off the feeder cores (see tune_worker).
+    """
+    with _feeder_lock:
+        free = sorted(PIPELINE_CPUS - _feeder_cpus)
+        cpu = free[0] if len(free) >= 2 else None
+        if cpu is not None:
+            _feeder_cpus.add(cpu)
+    if cpu is None:
+        yield
+        return
+    previous = os.sched_getaffinity(0)
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except OSError:
+        # Not permitted - feed unpinned and leave the core to the workers
+        with _feeder_lock:
+            _feeder_cpus.discard(cpu)
+        yield
+        return
     try:
-        subprocess.run(['which', 'gtar'], capture_output=True, check=True)
-        tools.append('gtar')
-    except subprocess.CalledProcessError:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
+        with _feeder_lock:
+            _feeder_cpus.discard(cpu)
+
+class PythonStage:
+    """
+    Pipeline stage that runs func(src, dst) on a thread instead of in a child process
+    
+    Quacks like Popen (args, stdin, stdout, returncode, wait, terminate) so
+    start_pipeline and wait_pipeline treat it like any other stage. Pipe ends it
+    creates or receives from the previous stage are closed when func returns, so
+    EOF propagates.
+    """
+    
+    @staticmethod
+    def label(func):
+        """Display name of a stage function (its `label` attribute, else its name)"""
+        return getattr(func, 'label', func.__name__)
+    
+    def __init__(self, func, stdin=None, stdout=None, owns_stdin=False):
+        self.args = [PythonStage.label(func)]
+        self.stdin = None
+        self.stdout = None
+        self.returncode = None
+        
+        if stdin == subprocess.PIPE:
+            read_fd, write_fd = os.pipe()
+            self.stdin = open(write_fd, 'wb')
+            src, owns_stdin = open(read_fd, 'rb'), True
+        elif isinstance(stdin, int) or stdin is None:
+            src = open(sys.stdin.fileno() if stdin is None else stdin, 'rb', closefd=False)
+        else:
+            src = stdin
+        
+        if stdout == subprocess.PIPE:
+            read_fd, write_fd = os.pipe()
+            set_pipe_size(write_fd)
+            self.stdout = open(read_fd, 'rb')
+            dst, owns_stdout = open(write_fd, 'wb'), True
+        else:
+            out_fd = sys.stdout.fileno() if stdout is None else stdout if isinstance(stdout, int) else stdout.fileno()
+            dst, owns_stdout = open(out_fd, 'wb', closefd=False), True
+        
+        def run():
+            # A thread started from a pinned feeder inherits its single core - move
+            # it to the worker cores like a child process
+            cpus = worker_cpus()
+            if cpus:
+                try:
+                    os.sched_setaffinity(0, cpus)
+                except OSError:
+                    pass
+            try:
+                func(src, dst)
+                dst.flush()
+                self.returncode = 0
+            except BrokenPipeError:
+                self.returncode = 1  # Downstream exited early
+            except Exception as e:
+                print(f"❌ {self.args[0]} failed: {e or type(e).__name__}")
+                self.returncode = 1
+            finally:
+                for f, owned in ((src, owns_stdin), (dst, owns_stdout)):
+                    if owned:
+                        try:
+                            f.close()
+                        except OSError:
+                            pass
+        
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+    
+    def wait(self):
+        self._thread.join()
+        return self.returncode
+    
+    def terminate(self):
+        """
+        Stop the stage the only way a thread can be: close the pipe ends the
+        parent holds, so func sees EOF on its input or EPIPE on its output
+        """
+        for f in (self.stdin, self.stdout):
+            if f:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+
+def start_pipeline(commands, stdin=None, stdout=None, pass_fds=()):
+    """
+    Start commands as a pipeline (cmd1 | cmd2 | ...) without going through a shell
+    
+    Each intermediate pipe gets a 1MB buffer and the parent's copy of it is closed,
+    so EOF and SIGPIPE propagate between the children exactly as in a shell pipeline.
+    Every stage is tuned as a batch worker (see tune_worker). A stage may also be a
+    Python callable func(src, dst), which runs on a thread (see PythonStage).
+    
+    Args:
+        commands (list): Argument lists (or callables), one per pipeline stage
+        stdin: stdin of the first stage (file object, fd, subprocess.PIPE or None)
+        stdout: stdout of the last stage (file object, fd, subprocess.PIPE or None)
+        pass_fds: Extra fds the stages inherit (e.g. a password pipe); closed in
+            the parent once the pipeline has started
+    
+    Returns:
+        list: Popen objects in pipeline order
+    
+    Raises:
+        OSError: A stage could not be started (the stages already running are
+            terminated and reaped first)
+    """
+    print(f"🔧 Executing command:")
+    print(f"   {' | '.join(' '.join(cmd) if isinstance(cmd, list) else PythonStage.label(cmd) for cmd in commands)}")
+    print()
+    
+    procs = []
+    try:
+        for i, cmd in enumerate(commands):
+            last = i == len(commands) - 1
+            if callable(cmd):
+                # The thread takes over (and closes) the previous stage's read end
+                proc = PythonStage(
+                    cmd,
+                    stdin=procs[-1].stdout if procs else stdin,
+                    stdout=stdout if last else subprocess.PIPE,
+                    owns_stdin=bool(procs)
+                )
+                procs.append(proc)
+                continue
+            proc = subprocess.Popen(
+                cmd,
+                stdin=procs[-1].stdout if procs else stdin,
+                stdout=stdout if last else subprocess.PIPE,
+                pass_fds=pass_fds
+            )
+            tune_worker(proc.pid)
+            if procs:
+                procs[-1].stdout.close()  # Only the child holds the read end now
+            if not last:
+                set_pipe_size(proc.stdout.fileno())
+            procs.append(proc)
+    except BaseException:
+        # A later stage failed to start - stop and reap what is already running
+        # rather than leaving orphaned children or threads blocked on a pipe
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            for f in (proc.stdin, proc.stdout):
+                if f:
+                    try:
+                        f.close()
+                    except OSError:
+                        pass
+            proc.wait()
+        raise
+    finally:
+        for fd in pass_fds:
+            os.close(fd)
+    return procs
+
+def wait_pipeline(procs, check=True):
+    """
+    Wait for every stage of a pipeline, raising CalledProcessError on the first failure
+    
+    Returns:
+        bool: True if every stage exited 0 (only False with check=False)
+    """
+    for proc in procs:
+        proc.wait()
+
+    failed = [proc for proc in procs if proc.returncode != 0]
+    if not failed:
+        print(f"✅ Pipeline completed successfully")
+        print()
+        return True
+
+    proc = failed[0]
+    print(f"{'❌' if check else '⚠️ '} Command failed: {' '.join(proc.args)}")
+    print(f"   Exit code: {proc.returncode}")
+    print()
+    if check:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    return False
+
+def run_pipeline(commands, stdin=None, stdout=None, check=True, pass_fds=()):
+    """Run commands as a shell-free pipeline and wait for all of them"""
+    wait_pipeline(start_pipeline(commands, stdin=stdin, stdout=stdout, pass_fds=pass_fds), check=check)
+
+@functools.lru_cache(maxsize=None)
+def have_tool(name):
+    """Whether an executable is on PATH (looked up once per name, without spawning `which`)"""
+    return shutil.which(name) is not None
+
+def check_dependencies(compress=None):
+    """
+    Check if required tools are available
+    
+    Args:
+        compress: 'zstd' to require the zstd CLI, 'gzip' for the best gzip tool,
+                  'auto'/None for zstd when installed and gzip otherwise
+    
+    Returns:
+        str: Compressor name for get_compression_command
+    """
+    # Check for gtar (GNU tar) - required for proper macOS support
+    if not have_tool('gtar'):
         print("⚠️  GNU tar (gtar) not found!")
         print("   macOS BSD tar has issues with extended attributes.")
         print("   Please install GNU tar:")
@@ -168,34 +460,82 @@ def check_dependencies():
         print("   After installation, restart this script.")
         sys.exit(1)
     
+    # zstd compresses as fast as pigz, and decompresses several times faster than gzip
+    if compress != 'gzip':
+        if have_tool('zstd'):
+            return 'zstd'
+        if compress == 'zstd':
+            print("❌ zstd not found - install it (apt install zstd / brew install zstd) or use --compress gzip")
+            sys.exit(1)
+    
     # Check for pigz (parallel gzip) - faster alternative
-    try:
-        subprocess.run(['which', 'pigz'], capture_output=True, check=True)
-        tools.append('pigz')
-        return 'pigz'  # Use pigz if available
-    except subprocess.CalledProcessError:
-        pass
+    if have_tool('pigz'):
+        return 'pigz'
     
-    # Check for pbzip2 (parallel bzip2)
-    try:
-        subprocess.run(['which', 'pbzip2'], capture_output=True, check=True)
-        tools.append('pbzip2')
-    except subprocess.CalledProcessError:
-        pass
-        
     return 'gzip'  # Default to gzip
 
-def get_compression_command(compressor, threads=None):
-    """Get the appropriate compression command"""
+def get_compression_command(compressor, threads=None, level=None):
+    """
+    Get the appropriate compression command
+    
+    Args:
+        compressor (str): 'zstd', 'pigz', 'pbzip2' or 'gzip'
+        threads (int): Compression threads (None = all CPUs)
+        level (int): Compression level (None = the tool's default; zstd: 3)
+    """
     if threads is None:
-        threads = os.cpu_count() or 4
+        threads = CPU_COUNT
     
     if compressor == 'pigz':
-        return f"pigz -p {threads}"
+        # Independent 1MB blocks (-i) cost ~1-2% in size but let rapidgzip inflate
+        # them on separate cores without first resolving back-references
+        return f"pigz -p {threads} -i -b 1024" + (f" -{level}" if level else "")
     elif compressor == 'pbzip2':
-        return f"pbzip2 -p{threads}"
+        return f"pbzip2 -p{threads}" + (f" -{level}" if level else "")
+    elif compressor == 'zstd':
+        # 128MB match window (--long=27) is still within zstd's default decompression limit
+        return f"zstd -q -c -{level or 3} --long=27 -T{threads}"
     else:
-        return "gzip"
+        return "gzip" + (f" -{level}" if level else "")
+
+def get_compression_level(args):
+    """Compression level from --compress-level, else COMPRESSION_LEVEL in config.py, else None"""
+    level = getattr(args, 'compress_level', None)
+    if level is None and HAS_CONFIG:
+        level = getattr(config, 'COMPRESSION_LEVEL', None)
+    return level
+
+def get_decompression_command(archive, threads=None):
+    """
+    Get the fastest installed decompression command for an archive name
+    
+    rapidgzip inflates disjoint regions of a gzip stream on separate cores and
+    igzip (ISA-L) is a much faster single-core inflater; pugz is not considered
+    since it only handles ASCII payloads, not tar. lbzip2 decompresses any
+    bzip2 stream in parallel, pbzip2 only its own multi-stream output. zstd
+    archives are written by `zstd -T` as a single frame, which no tool decodes
+    in parallel (pzstd only splits its own multi-frame output), so plain zstd
+    is used.
+    
+    Args:
+        archive (str): Archive file name (.tar.gz, .tar.bz2, .tar.zst)
+        threads (int): rapidgzip/lbzip2/pbzip2 threads (None = all CPUs)
+    
+    Returns:
+        str: Command reading the compressed stream on stdin, writing to stdout
+    """
+    threads = threads or CPU_COUNT
+    if archive.endswith('.bz2'):
+        if have_tool('lbzip2'):
+            return f"lbzip2 -dc -n {threads}"
+        return f"pbzip2 -dc -p{threads}" if have_tool('pbzip2') else "bzip2 -dc"
+    if archive.endswith('.zst'):
+        return "zstd -dc"
+    if have_tool('rapidgzip'):
+        return f"rapidgzip -d -c -P {threads}"
+    if have_tool('igzip'):
+        return "igzip -dc"
+    return "pigz -dc" if have_tool('pigz') else "gzip -dc"
 
 def get_encryption_config(args):
     """
@@ -218,12 +558,15 @@ def get_encryption_config(args):
         print("   Make sure crypto.py is in the same directory")
         sys.exit(1)
     
-    # Check OpenSSL
-    if not crypto.check_openssl():
+    # Check OpenSSL (not needed when the cipher runs in-process)
+    if not crypto.stream_cipher_available() and not crypto.check_openssl():
         print("❌ OpenSSL not found! Encryption requires OpenSSL")
         print("   Install with: brew install openssl")
         sys.exit(1)
     
+    if not crypto.pbkdf2_accelerated():
+        print("⚠️  Python's hashlib is not backed by OpenSSL 1.1.1+ - key derivation will be slow")
+    
     # Get password
     password = getattr(args, 'password', None)
     if not password and HAS_CONFIG:
@@ -250,22 +593,115 @@ def get_encryption_config(args):
     
     return enabled, password, salt_hex, iterations
 
-def create_exclusion_file(exclusions, temp_dir="."):
-    """Create a temporary file with exclusion patterns for tar --exclude-from"""
-    import tempfile
+def get_kdf_config(args):
+    """
+    Get the key derivation function and its parameters from args or config file
+    
+    Returns:
+        tuple: (kdf, kdf_params) - kdf_params is a dict or None
+    """
+    kdf = getattr(args, 'kdf', None)
+    if not kdf and HAS_CONFIG:
+        kdf = getattr(config, 'ENCRYPTION_KDF', None)
+    kdf = (kdf or crypto.KDF_PBKDF2).lower()
+    if kdf not in crypto.KDF_CHOICES:
+        print(f"❌ Unknown KDF '{kdf}' (choose from: {', '.join(crypto.KDF_CHOICES)})")
+        sys.exit(1)
+    
+    params_text = getattr(args, 'kdf_params', None)
+    if not params_text and HAS_CONFIG:
+        params_text = getattr(config, 'ENCRYPTION_KDF_PARAMS', None)
+    try:
+        kdf_params = crypto.parse_kdf_params(params_text) or None
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
+    if kdf == crypto.KDF_ARGON2ID and not crypto.HAS_ARGON2:
+        print("❌ --kdf argon2id needs the argon2-cffi package: pip install argon2-cffi")
+        sys.exit(1)
+    return kdf, kdf_params
+
+def encrypt_stage(password, salt_hex, iterations, algorithm, nonce=None, kdf=None, kdf_params=None, workers=1):
+    """
+    Pipeline stage that encrypts with algorithm (see crypto.preferred_cipher)
+    
+    GCM always runs in-process on a thread (crypto.gcm_encrypt_stream). CTR and CBC run
+    in-process when the cryptography package is installed - one process and one
+    pipe hop fewer - otherwise in openssl with the password on an inherited fd.
+    In-process stages encrypt independent chunks on workers threads.
+    
+    Returns:
+        tuple: (stage, pass_fds) for start_pipeline/run_pipeline
+    """
+    if algorithm == crypto.GCM_CIPHER:
+        def stage(src, dst):
+            crypto.gcm_encrypt_stream(src, dst, password, salt_hex, iterations, nonce,
+                                      kdf=kdf or crypto.KDF_PBKDF2, kdf_params=kdf_params, workers=workers)
+    elif crypto.stream_cipher_available(algorithm):
+        def stage(src, dst):
+            crypto.encrypt_stream(src, dst, password, salt_hex, iterations, workers=workers,
+                                  algorithm=algorithm)
+    else:
+        pass_fd = crypto.password_pipe(password)
+        return crypto.encrypt_pipeline_cmd(password, salt_hex, iterations, algorithm, pass_fd=pass_fd).split(), (pass_fd,)
+    stage.label = f"{algorithm.lower()} (in-process)"
+    return stage, ()
+
+def decrypt_stage(password, salt_hex, iterations, algorithm, nonce=None, chunk_size=None, kdf=None, kdf_params=None,
+                  workers=1):
+    """
+    Pipeline stage that decrypts algorithm - counterpart of encrypt_stage
+    
+    In-process GCM/CTR stages decrypt independent chunks on workers threads.
+    """
+    if algorithm == crypto.GCM_CIPHER:
+        def stage(src, dst):
+            crypto.gcm_decrypt_stream(src, dst, password, salt_hex, iterations, nonce,
+                                      chunk_size or crypto.GCM_CHUNK_SIZE,
+                                      kdf=kdf or crypto.KDF_PBKDF2, kdf_params=kdf_params, workers=workers)
+    elif crypto.stream_cipher_available(algorithm):
+        def stage(src, dst):
+            crypto.decrypt_stream(src, dst, password, salt_hex, iterations, workers=workers,
+                                  algorithm=algorithm)
+    else:
+        pass_fd = crypto.password_pipe(password)
+        return crypto.decrypt_pipeline_cmd(password, salt_hex, iterations, algorithm, pass_fd=pass_fd).split(), (pass_fd,)
+    stage.label = f"{algorithm.lower()} -d (in-process)"
+    return stage, ()
+
+def create_exclusion_file(exclusions, temp_dir=None):
+    """
+    Create a temporary file with exclusion patterns for tar --exclude-from
+    
+    The file goes to /dev/shm (RAM) when there is one, else the system temp dir.
+    Duplicates are dropped and cheap patterns come first: directory patterns
+    (Library/*) and plain names before extension globs (*.log) and other
+    wildcards, since tar tries the patterns in file order for every member.
+    """
+    if temp_dir is None:
+        temp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    
+    def cost(pattern):
+        if pattern.endswith('/*') or '*' not in pattern:
+            return 0
+        return 1 if pattern.startswith('*') and '*' not in pattern[1:] else 2
+    exclusions = sorted(dict.fromkeys(exclusions), key=cost)  # Stable: keeps the user's order within a group
     
-    # Use current directory instead of system temp
     fd, temp_file = tempfile.mkstemp(
         dir=temp_dir, 
         prefix="archivedir_exclude_", 
-        suffix=".txt",
-        text=True  # Text mode for better efficiency
+        suffix=".txt"
     )
     
     try:
-        # Write all patterns at once to minimize I/O operations
-        with os.fdopen(fd, 'w', buffering=8192) as f:  # 8KB buffer
-            f.write('\n'.join(exclusions) + '\n')
+        # The whole list goes out in one write(2), however many patterns there are
+        # (tar reads it as bytes, one pattern per line, so it is encoded like paths)
+        data = memoryview(('\n'.join(exclusions) + '\n').encode(errors='surrogateescape'))
+        with os.fdopen(fd, 'wb', buffering=0) as f:
+            written = 0
+            while written < len(data):  # Raw writes may be partial
+                written += f.write(data[written:])
         return temp_file
     except:
         try:
@@ -274,123 +710,510 @@ def create_exclusion_file(exclusions, temp_dir="."):
             pass
         raise
 
-def should_exclude_path(path, exclusions, base_path):
-    """Check if a path matches any exclusion pattern"""
+def list_parts(prefix):
+    """
+    List files starting with prefix, sorted by name, in a single directory scan
+    
+    Returns:
+        list: [(path, size_bytes), ...] - sizes come from the scandir entries
+    """
+    dirname, name_prefix = os.path.split(prefix)
+    parts = []
+    with os.scandir(dirname or '.') as entries:
+        for entry in entries:
+            if entry.name.startswith(name_prefix) and entry.is_file():
+                parts.append((entry.path, entry.stat().st_size))
+    parts.sort()
+    return parts
+
+# Destination URL scheme -> cloud type
+CLOUD_SCHEMES = {'s3': 's3', 'gs': 'gdrive', 'onedrive': 'onedrive'}
+
+def detect_cloud_destination(dest):
+    """Detect if destination is cloud storage based on path or scheme"""
+    scheme = urlparse(dest).scheme
+    if scheme in CLOUD_SCHEMES and dest.startswith(scheme + '://'):
+        return CLOUD_SCHEMES[scheme], dest[len(scheme) + 3:]  # Remove scheme:// prefix
+    return 'local', dest
+
+# Send size for file-like HTTP bodies (http.client default 8KB, urllib3 2.x 16KB)
+HTTP_BLOCKSIZE = 1024 * 1024  # 1MB
+
+def raise_http_blocksize(blocksize=HTTP_BLOCKSIZE):
+    """
+    Raise the default blocksize of http.client and urllib3 connections
+    
+    botocore sends file-like bodies through these classes in blocksize reads and
+    sendall calls, so the 8-16KB default means a GIL round trip every few KB.
+    Only defaults change - an explicit blocksize argument still wins.
+    """
+    classes = [http.client.HTTPConnection]
     try:
-        # Get relative path from base
-        rel_path = os.path.relpath(path, base_path)
+        import urllib3.connection
+        classes.append(urllib3.connection.HTTPConnection)
+    except ImportError:
+        pass
+    for cls in classes:
+        init = cls.__init__
+        if init.__kwdefaults__ and 'blocksize' in init.__kwdefaults__:
+            init.__kwdefaults__['blocksize'] = blocksize  # urllib3 2.x: keyword-only
+        elif init.__defaults__ and 'blocksize' in init.__code__.co_varnames[:init.__code__.co_argcount]:
+            names = init.__code__.co_varnames[:init.__code__.co_argcount]
+            defaults = list(init.__defaults__)
+            defaults[names.index('blocksize') - (len(names) - len(defaults))] = blocksize
+            init.__defaults__ = tuple(defaults)
+
+# Recycled part bodies: full parts are assembled in these instead of fresh allocations
+_PART_BUFFERS = collections.deque(maxlen=8)
+
+class LazyMultipartUploader:
+    """
+    Writable S3 object that only goes multipart once it outgrows one part
+    
+    Bytes are buffered until part_size is reached; only then is a multipart
+    upload created and the part sent. An object that ends below part_size is
+    sent with a single PutObject instead of Create + UploadPart + Complete.
+    With an executor, parts upload in the background while the next one is
+    buffered, at most max_inflight at a time.
+    """
+    
+    MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+    
+    def __init__(self, s3_client, bucket, key, part_size=MIN_PART_SIZE, executor=None, max_inflight=1):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.upload_id = None
+        self.parts = []
+        self.part_count = 0
+        self._executor = executor
+        self._max_inflight = max(1, max_inflight)
+        self._inflight = collections.deque()
+        self._chunks = collections.deque()  # Written chunks, joined once per part (no growing buffer)
+        self._size = 0
+    
+    def write(self, data):
+        self._chunks.append(data)
+        self._size += len(data)
+        while self._size > self.part_size:  # Strictly more: an exact part_size object is one PUT
+            if self.upload_id is None:
+                mpu = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.key)
+                self.upload_id = mpu['UploadId']
+            self._upload_part(self._take(self.part_size))
+        return len(data)
+    
+    def write_from(self, stream, limit):
+        """
+        Read up to limit bytes (at most one part) from stream straight into a part buffer
+        
+        stream.readinto fills a recycled bytearray, which _take then sends as is,
+        so a full part costs no per-chunk bytes objects and no copy.
         
-        for pattern in exclusions:
-            # Simple glob-style matching
-            if pattern.endswith('/*'):
-                # Directory wildcard: Library/*
-                prefix = pattern[:-2]
-                if rel_path.startswith(prefix + '/') or rel_path == prefix:
-                    return True
-            elif '*' in pattern:
-                # Wildcard pattern: *.dill
-                import fnmatch
-                if fnmatch.fnmatch(os.path.basename(path), pattern):
-                    return True
-                if fnmatch.fnmatch(rel_path, pattern):
-                    return True
+        Returns:
+            int: Bytes read (0 at EOF)
+        """
+        buf = self._part_buffer()
+        want = min(limit, self.part_size)
+        filled = 0
+        with memoryview(buf) as view:
+            while filled < want and (n := stream.readinto(view[filled:want])):
+                filled += n
+        if filled < self.part_size:
+            _PART_BUFFERS.append(buf)
+            if filled:
+                self.write(bytes(buf[:filled]))  # Short (last) piece of the object
+        else:
+            self.write(buf)
+        return filled
+    
+    def _take(self, size):
+        """
+        First size buffered bytes as one part body; the rest stays as a memoryview
+        
+        A full part is copied into a recycled bytearray (see _part_buffer) - unless
+        it already is one, from write_from; the short last part is joined into
+        bytes of its exact size.
+        """
+        full = size == self.part_size
+        if full and isinstance(self._chunks[0], bytearray) and len(self._chunks[0]) == size:
+            self._size -= size
+            return self._chunks.popleft()
+        body = self._part_buffer() if full else []
+        out = memoryview(body) if full else None
+        taken = 0
+        while taken < size:
+            chunk = self._chunks.popleft()
+            if taken + len(chunk) > size:
+                view = memoryview(chunk)
+                self._chunks.appendleft(view[size - taken:])
+                chunk = view[:size - taken]
+            if full:
+                out[taken:taken + len(chunk)] = chunk
             else:
-                # Exact match
-                if rel_path == pattern or rel_path.startswith(pattern + '/'):
-                    return True
-        return False
-    except:
-        return False
+                body.append(chunk)
+            taken += len(chunk)
+        self._size -= taken
+        return body if full else b''.join(body)
+    
+    def _part_buffer(self):
+        """A part_size bytearray from _PART_BUFFERS, or a new one"""
+        while True:
+            try:
+                buf = _PART_BUFFERS.popleft()
+            except IndexError:
+                return bytearray(self.part_size)
+            if len(buf) == self.part_size:
+                return buf
+    
+    def _upload_part(self, body):
+        self.part_count += 1
+        if self._executor is None:
+            self._send_part(self.part_count, body)
+            return
+        self._inflight.append(self._executor.submit(self._send_part, self.part_count, body))
+        while len(self._inflight) > self._max_inflight:
+            self._inflight.popleft().result()  # Bounds memory to max_inflight parts; re-raises failures
+    
+    def _send_part(self, part_num, body):
+        response = self.s3_client.upload_part(Bucket=self.bucket, Key=self.key, PartNumber=part_num,
+                                              UploadId=self.upload_id, Body=body)
+        self.parts.append({'PartNumber': part_num, 'ETag': response['ETag']})
+        if isinstance(body, bytearray):
+            _PART_BUFFERS.append(body)  # Sent - the next full part can reuse it
+    
+    def _drain(self):
+        """Wait for background parts; the first failure is raised after all have finished"""
+        errors = []
+        while self._inflight:
+            try:
+                self._inflight.popleft().result()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+    
+    def close(self):
+        """Send what is left: PutObject if no multipart upload was needed, else last part + Complete"""
+        body = self._take(self._size)
+        if self.upload_id is None:
+            self.s3_client.put_object(Bucket=self.bucket, Key=self.key, Body=body)
+        else:
+            if body or not self.part_count:
+                self._upload_part(body)
+            self._drain()
+            self.parts.sort(key=lambda part: part['PartNumber'])
+            self.s3_client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                                     MultipartUpload={'Parts': self.parts})
+    
+    def abort(self):
+        """Drop a started multipart upload so S3 does not keep (and bill) its parts"""
+        if self.upload_id is not None:
+            try:
+                self._drain()
+            except Exception:
+                pass
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.upload_id = None
 
-def detect_cloud_destination(dest):
-    """Detect if destination is cloud storage based on path or scheme"""
-    if dest.startswith('s3://'):
-        return 's3', dest[5:]  # Remove s3:// prefix
-    elif dest.startswith('gs://'):
-        return 'gdrive', dest[5:]  # Remove gs:// prefix
-    elif dest.startswith('onedrive://'):
-        return 'onedrive', dest[11:]  # Remove onedrive:// prefix
-    else:
-        return 'local', dest
+# S3 objects and their multipart parts are kept on 16MB boundaries
+S3_PART_SIZE = 16 * 1024 * 1024  # 16MB
+ONEDRIVE_CHUNK_SIZE = 320 * 1024 * 10  # 3.2MB (upload sessions need a multiple of 320KB)
+S3_MAX_PARTS = 10000
 
-def stream_to_s3(file_stream, bucket, key, part_size_mb=100):
-    """Stream data to S3 using multipart upload"""
+def s3_part_sizes(part_size_gb):
+    """
+    Object and multipart part size for a --size value, aligned to S3_PART_SIZE
+    
+    The object size is rounded to the nearest multiple of 16MB (at least one),
+    so every object but the last is a whole number of parts. The part size only
+    grows beyond 16MB when an object would otherwise need more than 10000 parts.
+    
+    Returns:
+        tuple: (object_size_bytes, multipart_part_size_bytes)
+    """
+    object_size = max(S3_PART_SIZE, round(part_size_gb * 1024**3 / S3_PART_SIZE) * S3_PART_SIZE)
+    parts_per_slot = -(-object_size // (S3_PART_SIZE * S3_MAX_PARTS))  # ceil
+    return object_size, S3_PART_SIZE * parts_per_slot
+
+def upload_file_multipart(s3_client, path, bucket, key, part_size=S3_PART_SIZE, executor=None, size=None):
+    """
+    Upload a local file to S3, reading its parts in parallel with pread
+    
+    Each worker reads only its own byte range (os.pread on one shared fd - no
+    seeking, no per-part file handles), so memory stays at one part per worker.
+    A file no larger than one part is sent with a single PutObject.
+    
+    Args:
+        size (int): File size when the caller already knows it (skips the stat)
+    
+    Returns:
+        int: Number of multipart parts (0 for a single PUT)
+    """
+    if size is None:
+        size = os.path.getsize(path)
+    if size <= part_size:
+        with open(path, 'rb') as f:
+            s3_client.put_object(Bucket=bucket, Key=key, Body=f)
+        return 0
+    
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key)['UploadId']
+    fd = os.open(path, os.O_RDONLY)
+    
+    def send(part_num):
+        body = os.pread(fd, part_size, (part_num - 1) * part_size)
+        response = s3_client.upload_part(Bucket=bucket, Key=key, PartNumber=part_num,
+                                         UploadId=upload_id, Body=body)
+        return {'PartNumber': part_num, 'ETag': response['ETag']}
+    
+    try:
+        part_numbers = range(1, -(-size // part_size) + 1)
+        parts = list(executor.map(send, part_numbers) if executor else map(send, part_numbers))
+        s3_client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id,
+                                            MultipartUpload={'Parts': parts})
+        return len(parts)
+    except Exception:
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    finally:
+        os.close(fd)
+
+def stream_to_s3(file_stream, bucket, folder, filename, part_size_gb=2, workers=4, profile=None, spool_dir=None):
+    """
+    Stream data to S3 as <folder>/<filename>.part_NNN objects of part_size_gb each
+    (rounded to a multiple of 16MB, see s3_part_sizes)
+    
+    Each object goes through a LazyMultipartUploader, so small archives (and a
+    small last part) cost one PutObject rather than three multipart requests.
+    Multipart parts are sent by a pool of `workers` threads (boto3 clients are
+    thread-safe and release the GIL on network I/O).
+    
+    With spool_dir, each object is first written to a temp file there and sent by
+    upload_file_multipart on a background thread while the next one is written
+    (at most two objects on disk), instead of buffering parts in memory.
+    
+    Args:
+        workers (int): Parallel part uploads (also the number of parts held in memory)
+        profile (str): AWS profile name (None or 'default' = standard credential chain)
+        spool_dir (str): Directory for staging objects on disk (None = stream from memory)
+    
+    Returns:
+        int: Number of objects uploaded
+    """
     if not HAS_S3:
         raise ImportError("boto3 not installed. Install with: pip install boto3")
     
-    print(f"☁️  Streaming to S3: s3://{bucket}/{key}")
+    import boto3
     
-    s3_client = boto3.client('s3')
+    print(f"☁️  Streaming to S3: s3://{bucket}/{folder}/{filename}.part_*")
+    print(f"   💡 {workers} parallel part upload(s)")
     
-    # Initiate multipart upload
-    mpu = s3_client.create_multipart_upload(Bucket=bucket, Key=key)
-    upload_id = mpu['UploadId']
+    raise_http_blocksize()
+    session = boto3.Session(profile_name=profile if profile and profile != 'default' else None)
+    s3_client = session.client('s3')
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    part_size_bytes, mpu_part_size = s3_part_sizes(part_size_gb)
+    print(f"   💡 {part_size_bytes / (1024**2):.0f} MB objects in {mpu_part_size / (1024**2):.0f} MB parts")
     
-    parts = []
-    part_num = 1
-    chunk_size = part_size_mb * 1024 * 1024
+    if spool_dir:
+        try:
+            part_num, total_uploaded = _spool_to_s3(file_stream, s3_client, bucket, folder, filename,
+                                                    part_size_bytes, mpu_part_size, executor, spool_dir)
+        finally:
+            if executor:
+                executor.shutdown()
+        print(f"   ✅ Successfully uploaded to S3: {part_num} object(s), {total_uploaded / (1024**3):.2f} GB")
+        return part_num
     
-    try:
-        while True:
-            chunk = file_stream.read(chunk_size)
-            if not chunk:
-                break
+    part_num = 0
+    total_uploaded = 0
+    
+    while True:
+        key = f"{folder}/{filename}.part_{part_num:03d}"
+        uploader = LazyMultipartUploader(s3_client, bucket, key, mpu_part_size,
+                                         executor=executor, max_inflight=workers)
+        bytes_read = 0
+        try:
+            while bytes_read < part_size_bytes:
+                if hasattr(file_stream, 'readinto'):
+                    n = uploader.write_from(file_stream, part_size_bytes - bytes_read)
+                else:
+                    chunk = file_stream.read(min(1024 * 1024, part_size_bytes - bytes_read))  # 1MB chunks
+                    n = uploader.write(chunk)
+                if not n:
+                    break
+                bytes_read += n
             
-            print(f"   📤 Uploading part {part_num} ({len(chunk) / (1024**2):.1f} MB)...")
+            if bytes_read == 0:
+                break  # No more data (nothing was sent for this key)
             
-            response = s3_client.upload_part(
-                Bucket=bucket,
-                Key=key,
-                PartNumber=part_num,
-                UploadId=upload_id,
-                Body=chunk
-            )
+            uploader.close()
+        except Exception as e:
+            print(f"   ❌ Upload failed: {e}")
+            uploader.abort()
+            if executor:
+                executor.shutdown()
+            raise
+        
+        mode = f"{uploader.part_count} multipart parts" if uploader.part_count else "single PUT"
+        print(f"   📤 Uploaded {key} ({bytes_read / (1024**2):.1f} MB, {mode})")
+        total_uploaded += bytes_read
+        part_num += 1
+        
+        if bytes_read < part_size_bytes:
+            break
+    
+    if executor:
+        executor.shutdown()
+    print(f"   ✅ Successfully uploaded to S3: {part_num} object(s), {total_uploaded / (1024**3):.2f} GB")
+    return part_num
+
+def list_s3_parts(s3_client, bucket, key_pattern):
+    """
+    Objects matching a key glob (** = *), listed under the literal prefix before its first wildcard
+    
+    Returns:
+        list: [(key, size), ...] sorted by key
+    """
+    key_pattern = key_pattern.replace('**', '*')
+    prefix = re.split(r'[*?\[]', key_pattern, maxsplit=1)[0]
+    matcher = re.compile(fnmatch.translate(key_pattern))
+    found = []
+    for page in s3_client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if matcher.match(obj['Key']):
+                found.append((obj['Key'], obj['Size']))
+    return sorted(found)
+
+class S3PartReader:
+    """
+    Read-only stream over consecutive S3 objects (the parts of one archive)
+    
+    The part index maps each key to its offset and length in the combined
+    stream. Bytes are fetched with ranged GETs of `window` bytes, and the next
+    window is requested while the current one is consumed, so memory stays at
+    two windows whatever the archive size.
+    """
+    
+    def __init__(self, s3_client, bucket, parts, window=S3_PART_SIZE):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.window = window
+        self.index = []  # [(key, stream_offset, length), ...]
+        offset = 0
+        for key, size in parts:
+            self.index.append((key, offset, size))
+            offset += size
+        self.size = offset
+        self._ranges = iter([(key, start, min(start + window, size) - 1)
+                             for key, _, size in self.index for start in range(0, size, window)])
+        self._fetcher = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._next = self._prefetch()
+        self._buf = memoryview(b'')
+    
+    def _prefetch(self):
+        byte_range = next(self._ranges, None)
+        return self._fetcher.submit(self._get, *byte_range) if byte_range else None
+    
+    def _get(self, key, first, last):
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={first}-{last}")
+        return response['Body'].read()
+    
+    def read(self, size=-1):
+        """Up to size bytes (a whole window if size < 0); b'' at the end of the last part"""
+        if not self._buf:
+            if self._next is None:
+                return b''
+            self._buf = memoryview(self._next.result())
+            self._next = self._prefetch()
+        n = len(self._buf) if size < 0 else min(size, len(self._buf))
+        data, self._buf = self._buf[:n], self._buf[n:]
+        return data
+    
+    def close(self):
+        self._fetcher.shutdown(cancel_futures=True)
+
+def _spool_to_s3(file_stream, s3_client, bucket, folder, filename, part_size_bytes, mpu_part_size, executor, spool_dir):
+    """
+    stream_to_s3 with objects staged in spool_dir - see its docstring
+    
+    Returns:
+        tuple: (objects_uploaded, bytes_uploaded)
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    part_num = 0
+    total_uploaded = 0
+    pending = None  # (thread, result dict) of the upload running in the background
+    
+    def upload(path, key, size, result):
+        try:
+            parts = upload_file_multipart(s3_client, path, bucket, key, mpu_part_size, executor, size=size)
+            mode = f"{parts} multipart parts" if parts else "single PUT"
+            print(f"   📤 Uploaded {key} ({size / (1024**2):.1f} MB, {mode})")
+        except Exception as e:
+            result['error'] = e
+        finally:
+            os.unlink(path)
+    
+    def finish(pending):
+        thread, result = pending
+        thread.join()
+        if 'error' in result:
+            print(f"   ❌ Upload failed: {result['error']}")
+            raise result['error']
+    
+    try:
+        while True:
+            key = f"{folder}/{filename}.part_{part_num:03d}"
+            with tempfile.NamedTemporaryFile(dir=spool_dir, prefix='archivedir_', delete=False) as spool:
+                bytes_read = copy_from_pipe(file_stream, spool, part_size_bytes)
             
-            parts.append({
-                'PartNumber': part_num,
-                'ETag': response['ETag']
-            })
+            if bytes_read == 0:
+                os.unlink(spool.name)
+                break
             
+            if pending:
+                previous, pending = pending, None
+                try:
+                    finish(previous)
+                except Exception:
+                    os.unlink(spool.name)
+                    raise
+            result = {}
+            thread = threading.Thread(target=upload, args=(spool.name, key, bytes_read, result))
+            thread.start()
+            pending = (thread, result)
+            total_uploaded += bytes_read
             part_num += 1
-        
-        # Complete multipart upload
-        s3_client.complete_multipart_upload(
-            Bucket=bucket,
-            Key=key,
-            UploadId=upload_id,
-            MultipartUpload={'Parts': parts}
-        )
-        
-        print(f"   ✅ Successfully uploaded to S3: {len(parts)} parts")
-        return True
-        
-    except Exception as e:
-        print(f"   ❌ Upload failed: {e}")
-        # Abort multipart upload on failure
-        s3_client.abort_multipart_upload(
-            Bucket=bucket,
-            Key=key,
-            UploadId=upload_id
-        )
-        raise
+            
+            if bytes_read < part_size_bytes:
+                break
+    finally:
+        if pending:
+            finish(pending)
+    
+    return part_num, total_uploaded
 
 def stream_to_gdrive(file_stream, folder_path, filename, part_size_gb=2):
-    """Stream data to Google Drive with 2GB part splitting and immediate upload in background threads"""
+    """
+    Stream data to Google Drive as part_size_gb parts, each a resumable upload fed from the pipe
+    
+    Parts are uploaded one after another straight from file_stream through
+    PipeMediaUpload, so memory stays at two upload chunks whatever the part
+    size, and uploading overlaps with tar/compression through the pipe.
+    """
     if not HAS_GDRIVE:
         raise ImportError("Google API client not installed. Install with: pip install google-api-python-client google-auth-httplib2 google-auth-oauthlib")
     
     print(f"☁️  Streaming to Google Drive: {filename}")
-    print(f"   💡 Using {part_size_gb}GB parts with background upload")
+    print(f"   💡 Using {part_size_gb}GB parts, uploaded while the archive is written")
     
     # Import gdrive_helper for authentication and upload
     try:
-        from gdrive_helper import authenticate, get_or_create_folder_path, upload_file_streaming
+        from gdrive_helper import authenticate, get_or_create_folder_path, upload_file_streaming, PipeMediaUpload
     except ImportError:
         raise ImportError("gdrive_helper.py not found. Make sure it's in the same directory.")
     
-    import threading
-    import queue
-    
     # Authenticate
     service = authenticate()
     
@@ -405,110 +1228,126 @@ def stream_to_gdrive(file_stream, folder_path, filename, part_size_gb=2):
     total_uploaded = 0
     
     # Remove extension from filename for parts
-    base_filename = filename.replace('.tar.gz', '').replace('.tar.bz2', '')
+    base_filename = filename.replace('.tar.gz', '').replace('.tar.bz2', '').replace('.tar.zst', '')
     ext = filename.replace(base_filename, '')
-    
-    # Queue for upload threads
-    upload_threads = []
-    upload_results = queue.Queue()
-    
-    def upload_part_thread(part_buffer, part_filename, part_num, part_size):
-        """Upload part in background thread"""
-        try:
-            # Each thread needs its own service instance (Google API client is not thread-safe)
-            thread_service = authenticate()
-            
-            print(f"   🔄 [Thread {part_num}] Uploading {part_filename} in background...")
-            file_id = upload_file_streaming(
-                thread_service,
-                part_buffer,
-                part_filename,
-                folder_id=folder_id,
-                mime_type='application/gzip',
-                chunk_size_mb=10
-            )
-            upload_results.put({'part': part_num, 'success': True, 'size': part_size, 'file_id': file_id})
-            print(f"   ✅ [Thread {part_num}] Upload complete: {part_filename}")
-        except Exception as e:
-            upload_results.put({'part': part_num, 'success': False, 'error': str(e)})
-            print(f"   ❌ [Thread {part_num}] Upload failed: {e}")
-        finally:
-            part_buffer.close()
+    mime_type = 'application/zstd' if ext.endswith('.zst') else 'application/gzip'
     
     while True:
-        # Read one part into memory
-        print(f"\n   📥 Reading part {part_num}...")
-        buffer = io.BytesIO()
-        bytes_read = 0
-        
-        while bytes_read < part_size_bytes:
-            chunk = file_stream.read(min(1024 * 1024, part_size_bytes - bytes_read))  # 1MB chunks
-            if not chunk:
-                break
-            buffer.write(chunk)
-            bytes_read += len(chunk)
-            
-            if bytes_read % (100 * 1024 * 1024) == 0:  # Progress every 100MB
-                print(f"   📊 Read {bytes_read / (1024**2):.0f} MB for part {part_num}...", end='\r')
-        
-        if bytes_read == 0:
-            break  # No more data
-        
-        print(f"\n   ✅ Part {part_num} buffered: {bytes_read / (1024**2):.1f} MB")
-        buffer.seek(0)  # Reset to beginning for upload
+        # Reads the first chunk (and one ahead) - nothing left means we are done
+        # Drive only accepts a session's chunks in order, one at a time, so each
+        # chunk costs a round-trip stall; 32MB chunks (a multiple of Drive's 256KB)
+        # keep those to a few per GB at 64MB held in memory (chunk + read-ahead)
+        media = PipeMediaUpload(file_stream, part_size_bytes, mimetype=mime_type,
+                                chunksize=32 * 1024 * 1024)
+        if not media.bytes_read:
+            break
         
-        # Start upload in background thread
         part_filename = f"{base_filename}.part_{part_num:03d}{ext}"
+        print(f"\n   📤 Uploading part {part_num}: {part_filename}")
+        try:
+            upload_file_streaming(service, media, part_filename, folder_id=folder_id)
+        except Exception as e:
+            print(f"\n   ❌ Upload failed for part {part_num}: {e}")
+            raise
         
-        upload_thread = threading.Thread(
-            target=upload_part_thread,
-            args=(buffer, part_filename, part_num, bytes_read),
-            daemon=False
-        )
-        upload_thread.start()
-        upload_threads.append(upload_thread)
-        
-        print(f"   🚀 Part {part_num} upload started in background thread")
-        print(f"   💡 Main thread continues reading next part...")
-        
-        total_uploaded += bytes_read
+        total_uploaded += media.bytes_read
         part_num += 1
         
-        # Check if we read less than part size (last part)
-        if bytes_read < part_size_bytes:
+        # A part shorter than part_size_bytes was the last one
+        if media.bytes_read < part_size_bytes:
             break
     
-    # Wait for all uploads to complete
-    print(f"\n   ⏳ Waiting for all {len(upload_threads)} background uploads to complete...")
-    for idx, thread in enumerate(upload_threads):
-        thread.join()
-        print(f"   ✅ Thread {idx} finished")
-    
-    # Check results
-    failed_parts = []
-    while not upload_results.empty():
-        result = upload_results.get()
-        if not result['success']:
-            failed_parts.append(result['part'])
-    
-    if failed_parts:
-        print(f"\n   ❌ Upload failed for parts: {failed_parts}")
-        raise Exception(f"Upload failed for {len(failed_parts)} part(s)")
-    
     print(f"\n   🎉 All {part_num} parts uploaded successfully!")
     print(f"   📊 Total size: {total_uploaded / (1024**3):.2f} GB")
     
     return part_num
 
-def stream_to_onedrive(file_stream, folder_path, filename):
-    """Stream data to OneDrive using upload session"""
+def upload_onedrive_parts(file_stream, http, access_token, folder_path, filename, part_size_bytes,
+                          spool_dir=None, chunk_size=ONEDRIVE_CHUNK_SIZE):
+    """
+    Upload file_stream to OneDrive as <filename>.part_NNN files of part_size_bytes
+    
+    An upload session needs the file size in every Content-Range, which a pipe
+    cannot tell, so each part is first copied into a temp file in spool_dir with
+    counted reads (copy_from_pipe), then sent from there chunk by chunk. At most
+    one part is on disk at a time.
+    
+    Args:
+        http: requests.Session used for every request
+        chunk_size (int): Bytes per PUT (a multiple of 320KB)
+    
+    Returns:
+        tuple: (parts_uploaded, bytes_uploaded)
+    """
+    base_filename = filename.replace('.tar.gz', '').replace('.tar.bz2', '').replace('.tar.zst', '')
+    ext = filename.replace(base_filename, '')
+    headers = {
+        'Authorization': f'Bearer {access_token}',
+        'Content-Type': 'application/json'
+    }
+    part_num = 0
+    total_uploaded = 0
+    
+    while True:
+        with tempfile.TemporaryFile(dir=spool_dir, prefix='archivedir_') as spool:
+            size = copy_from_pipe(file_stream, spool, part_size_bytes)
+            if not size:
+                break
+            spool.seek(0)
+            
+            part_filename = f"{base_filename}.part_{part_num:03d}{ext}"
+            print(f"   📤 Uploading part {part_num}: {part_filename} ({size / (1024**2):.1f} MB)")
+            session_url = f"https://graph.microsoft.com/v1.0/me/drive/root:/{folder_path}/{part_filename}:/createUploadSession"
+            response = http.post(session_url, headers=headers)
+            response.raise_for_status()
+            upload_url = response.json()['uploadUrl']
+            
+            offset = 0
+            while offset < size:
+                chunk = spool.read(min(chunk_size, size - offset))
+                end = offset + len(chunk) - 1
+                response = http.put(upload_url, data=chunk, headers={
+                    'Content-Length': str(len(chunk)),
+                    'Content-Range': f'bytes {offset}-{end}/{size}'
+                })
+                response.raise_for_status()
+                offset += len(chunk)
+        
+        total_uploaded += size
+        part_num += 1
+        if size < part_size_bytes:
+            break  # A short part was the last one
+    
+    return part_num, total_uploaded
+
+def stream_to_onedrive(file_stream, folder_path, filename, part_size_gb=2, spool_dir=None):
+    """
+    Stream data to OneDrive as part_size_gb parts using upload sessions
+    
+    See upload_onedrive_parts - each part is staged in spool_dir (default: the
+    system temp directory) because an upload session needs its size up front.
+    
+    Returns:
+        int: Number of parts uploaded
+    """
     if not HAS_ONEDRIVE:
         raise ImportError("Microsoft Graph not installed. Install with: pip install msal requests")
     
+    from msal import PublicClientApplication
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
     print(f"☁️  Streaming to OneDrive: {folder_path}/{filename}")
+    print(f"   💡 Using {part_size_gb}GB parts, staged in {spool_dir or tempfile.gettempdir()}")
+    
+    # One keep-alive connection for every chunk (one TLS handshake), with
+    # backoff retries of PUTs that hit a transient server error
+    http = requests.Session()
+    http.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=8, max_retries=Retry(
+        total=5, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])))
     
     # Load app configuration
-    import json
     with open('onedrive_config.json') as f:
         config = json.load(f)
     
@@ -519,73 +1358,333 @@ def stream_to_onedrive(file_stream, folder_path, filename):
     )
     
     result = app.acquire_token_interactive(scopes=["Files.ReadWrite.All"])
-    access_token = result['access_token']
     
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json'
-    }
+    if spool_dir:
+        os.makedirs(spool_dir, exist_ok=True)
+    try:
+        part_num, total_uploaded = upload_onedrive_parts(file_stream, http, result['access_token'], folder_path,
+                                                         filename, int(part_size_gb * 1024 * 1024 * 1024),
+                                                         spool_dir=spool_dir)
+    except Exception as e:
+        print(f"   ❌ Upload failed: {e}")
+        raise
+    finally:
+        http.close()
+    print(f"   ✅ Successfully uploaded to OneDrive: {part_num} part(s), {total_uploaded / (1024**3):.2f} GB")
+    return part_num
+
+def _split_exclusions(exclusions):
+    """Exclusion patterns as (prefix set, wildcard pattern list) - see compile_exclusions"""
+    prefixes = frozenset(p[:-2] if p.endswith('/*') else p
+                         for p in exclusions if p.endswith('/*') or '*' not in p)
+    wildcards = [p for p in exclusions if '*' in p and not p.endswith('/*')]
+    return prefixes, wildcards
+
+def _name_suffix(pattern):
+    """
+    The literal X of a '*X' pattern (*.log), or None for any other pattern
     
-    # Create upload session
-    upload_url = f"https://graph.microsoft.com/v1.0/me/drive/root:/{folder_path}/{filename}:/createUploadSession"
-    session_response = requests.post(upload_url, headers=headers)
-    upload_session = session_response.json()
+    X has no '/' or wildcard, so the pattern matches a path exactly when the
+    path's last component ends with X - a plain endswith test on the name.
+    """
+    if pattern.startswith('*') and not re.search(r'[/*?\[]', pattern[1:]):
+        return pattern[1:]
+    return None
+
+def compile_exclusions(exclusions):
+    """
+    Compile exclusion patterns once, for is_excluded
     
-    # Upload in chunks
-    chunk_size = 320 * 1024 * 10  # 3.2 MB (must be multiple of 320 KB)
-    upload_url = upload_session['uploadUrl']
+    Directory (Library/*) and plain (.git) patterns exclude a relative path and
+    everything below it, so they go in a set; extension patterns (*.dill) become
+    one tuple for str.endswith on the name; the remaining wildcard patterns are
+    joined into one regex matched against the relative path and the name.
     
-    file_stream.seek(0, 2)  # Seek to end
-    file_size = file_stream.tell()
-    file_stream.seek(0)  # Seek back to start
+    Returns:
+        tuple: (prefixes, suffixes, wildcard_regex) - wildcard_regex is None without such patterns
+    """
+    prefixes, wildcards = _split_exclusions(exclusions)
+    suffixes = tuple(x for x in map(_name_suffix, wildcards) if x is not None)
+    wildcards = [p for p in wildcards if _name_suffix(p) is None]
+    wildcard_regex = re.compile('|'.join(fnmatch.translate(p) for p in wildcards)) if wildcards else None
+    return prefixes, suffixes, wildcard_regex
+
+def is_excluded(rel_path, name, exclusions):
+    """
+    Exclusion test for an entry of a top-down walk that prunes excluded directories
     
-    offset = 0
-    while True:
-        chunk = file_stream.read(chunk_size)
-        if not chunk:
-            break
-        
-        chunk_len = len(chunk)
-        headers = {
-            'Content-Length': str(chunk_len),
-            'Content-Range': f'bytes {offset}-{offset + chunk_len - 1}/{file_size}'
-        }
-        
-        print(f"   📤 Uploading bytes {offset}-{offset + chunk_len - 1}/{file_size}")
+    No ancestor of rel_path can be excluded there, so a prefix pattern only
+    matches the entry itself - one set lookup instead of a prefix scan.
+    """
+    prefixes, suffixes, wildcard_regex = exclusions
+    if rel_path in prefixes or name.endswith(suffixes):
+        return True
+    return bool(wildcard_regex and (wildcard_regex.match(rel_path) or wildcard_regex.match(name)))
+
+def _scan_dir(path, prefix, matcher):
+    """
+    One directory of scan_source, read with os.scandir
+    
+    Returns:
+        tuple: (bytes, file_count, dir_count, excluded_count, [(subdir_path, rel_prefix), ...])
+    """
+    size = files = dirs = excluded = 0
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                rel_path = prefix + entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # Pruned here, so excluded subtrees are never read
+                    if not is_excluded(rel_path, entry.name, matcher):
+                        dirs += 1
+                        if not entry.is_symlink():  # Like os.walk: symlinked dirs are not followed
+                            subdirs.append((entry.path, rel_path + '/'))
+                    continue
+                if is_excluded(rel_path, entry.name, matcher):
+                    excluded += 1
+                    continue
+                try:
+                    size += entry.stat().st_size
+                    files += 1
+                except OSError:
+                    pass  # Broken symlink, vanished file
+    except OSError:
+        pass  # Unreadable directory
+    return size, files, dirs, excluded, subdirs
+
+def find_command():
+    """GNU find (gfind on macOS), which scan_find needs for -printf, or None"""
+    for tool in ('gfind', 'find'):
+        try:
+            if subprocess.run([tool, '--version'], capture_output=True).returncode == 0:
+                return tool
+        except OSError:
+            pass
+    return None
+
+def scan_find(source, exclusions, find='find'):
+    """
+    scan_source done by one GNU find process
+    
+    The exclusions become find tests with the same meaning as is_excluded
+    (prefix patterns via -path, wildcards via -path and -name), excluded
+    directories are pruned, and find prints 'x' per excluded file, 'd' per
+    directory and '<size>\\n' per file. Python never stats a file, and each
+    block of output is tallied with bytes.count and one sum(map(int, ...)) -
+    C loops, no per-entry Python code. Symlinks count with their own size, as
+    tar stores them; broken ones are skipped.
+    
+    Returns:
+        tuple: (total_bytes, file_count, dir_count, excluded_file_count)
+    """
+    def glob_escape(text):
+        return re.sub(r'([*?\[\]\\])', r'\\\1', text)
+    
+    base = glob_escape(os.path.abspath(source))
+    prefixes, wildcards = _split_exclusions(exclusions)
+    tests = [['-path', f"{base}/{glob_escape(p)}"] for p in sorted(prefixes)]
+    for p in wildcards:
+        # *.log matches a path exactly when it matches the name - skip the slower -path test
+        if _name_suffix(p) is None:
+            tests.append(['-path', f"{base}/{p}"])
+        tests.append(['-name', p])
+    cmd = [find, os.path.abspath(source), '-mindepth', '1']
+    if tests:
+        cmd += ['(', *[arg for i, test in enumerate(tests) for arg in (['-o'] if i else []) + test], ')',
+                '(', '-xtype', 'd', '-prune', '-o', '-printf', 'x', ')', '-o']
+    cmd += ['(', '-xtype', 'd', '-printf', 'd', '-o', '-xtype', 'l', '-o', '-printf', '%s\\n', ')']
+    
+    source_size = file_count = dir_count = excluded_count = 0
+    next_report = 1000
+    # C locale: find's byte-wise pattern matching is much faster than the multibyte one
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=dict(os.environ, LC_ALL='C'))
+    partial = b''  # Digits of a size cut off at the end of the previous block
+    while block := proc.stdout.read(PIPE_SIZE):
+        excluded_count += block.count(b'x')
+        dir_count += block.count(b'd')
+        file_count += block.count(b'\n')
+        sizes, _, partial = (partial + block.translate(None, b'xd')).rpartition(b'\n')
+        source_size += sum(map(int, sizes.split()))
+        if file_count + excluded_count >= next_report:
+            print(f"   Scanned {file_count} files ({excluded_count} excluded), {dir_count} dirs...", end='\r')
+            next_report = file_count + excluded_count + 1000
+    proc.wait()  # Exit status 1 only means some entries were unreadable
+    return source_size, file_count, dir_count, excluded_count
+
+def scan_source(source, exclusions, workers=None):
+    """
+    Walk source once, applying exclusions, to total what tar will archive
+    
+    Uses scan_find when GNU find is installed. Otherwise directories are
+    scanned on a thread pool (stat calls release the GIL, so their latency
+    overlaps on cold caches and network filesystems); each finished
+    directory queues its subdirectories.
+    
+    Returns:
+        tuple: (total_bytes, file_count, dir_count, excluded_file_count)
+    """
+    find = find_command()
+    if find:
+        return scan_find(source, exclusions, find)
+    
+    source_size = 0
+    file_count = 0
+    dir_count = 0
+    excluded_count = 0
+    next_report = 1000
+    
+    # Get absolute base path for exclusion matching (patterns compiled once)
+    base_path = os.path.abspath(source)
+    matcher = compile_exclusions(exclusions)
+    workers = workers or CPU_COUNT * 2
+    results = queue.Queue()
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit(path, prefix):
+            pool.submit(_scan_dir, path, prefix, matcher).add_done_callback(results.put)
         
-        response = requests.put(upload_url, headers=headers, data=chunk)
-        offset += chunk_len
+        submit(base_path, '')
+        outstanding = 1
+        while outstanding:
+            size, files, dirs, excluded, subdirs = results.get().result()
+            outstanding -= 1
+            source_size += size
+            file_count += files
+            dir_count += dirs
+            excluded_count += excluded
+            for path, prefix in subdirs:
+                submit(path, prefix)
+            outstanding += len(subdirs)
+            
+            # Progress indicator every 1000 files to show activity
+            if file_count + excluded_count >= next_report:
+                print(f"   Scanned {file_count} files ({excluded_count} excluded), {dir_count} dirs...", end='\r')
+                next_report = file_count + excluded_count + 1000
     
-    print(f"   ✅ Successfully uploaded to OneDrive")
-    return True
+    return source_size, file_count, dir_count, excluded_count
 
-def should_exclude_path(path, exclusions, base_path):
-    """Check if a path matches any exclusion pattern"""
-    try:
-        # Get relative path from base
-        rel_path = os.path.relpath(path, base_path)
+def plan_shards(source, shards, exclusions):
+    """
+    Spread the top-level entries of source over shards of similar size
+    
+    Largest entries are placed first, each on the currently lightest shard.
+    
+    Returns:
+        list: One list of entry names per non-empty shard
+    """
+    base_path = os.path.abspath(source)
+    matcher = compile_exclusions(exclusions)
+    sized = []
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            # Top level: the relative path is the name and there is no ancestor to check
+            if is_excluded(entry.name, entry.name, matcher):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    size = tree_size(entry.path)[0]
+                else:
+                    size = entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                size = 0
+            sized.append((size, entry.name))
+    
+    bins = [[0, []] for _ in range(shards)]
+    for size, name in sorted(sized, reverse=True):
+        lightest = min(bins, key=lambda b: b[0])
+        lightest[0] += size
+        lightest[1].append(name)
+    return [sorted(names) for _, names in bins if names]
+
+def run_sharded_backup(source, base_output, shards, compressor, exclude_file, exclusions, size_bytes=None, level=None):
+    """
+    Back up source as several tar streams built and compressed in parallel
+    
+    Each shard is an independent compressed tar - .tar.zst by default, .tar.gz
+    or .tar.bz2 with --compress - named <archive>.shardNN and split into .part_
+    files when size_bytes is set. The compressor threads (zstd -T, pigz -p,
+    pbzip2 -p) are divided between the shards. Extraction unpacks the shards
+    side by side (run_sharded_extract), or with one worker reads them back to
+    back as one stream with tar --ignore-zeros.
+    
+    Returns:
+        list: [(path, size), ...] of all files written
+    """
+    source_name = os.path.basename(os.path.abspath(source))
+    parent = os.path.dirname(os.path.abspath(source))
+    plan = plan_shards(source, shards, exclusions)
+    comp_cmd = get_compression_command(compressor, threads=max(1, CPU_COUNT // len(plan)), level=level)
+    
+    print(f"\n🔀 Sharded mode: {len(plan)} parallel tar streams")
+    running = []
+    for k, names in enumerate(plan):
+        shard_output = f"{base_output}.shard{k:02d}"
+        print(f"   [{k}] {len(names)} top-level entries → {os.path.basename(shard_output)}")
+        tar_cmd = ["gtar", "-cf", "-", "--no-xattrs", "--no-acls"]
+        if exclude_file:
+            tar_cmd.extend(["--exclude-from", exclude_file])
+        tar_cmd.extend(["-C", parent, "--"] + [f"{source_name}/{name}" for name in names])
         
-        for pattern in exclusions:
-            # Simple glob-style matching
-            if pattern.endswith('/*'):
-                # Directory wildcard: Library/*
-                prefix = pattern[:-2]
-                if rel_path.startswith(prefix + '/') or rel_path == prefix:
-                    return True
-            elif '*' in pattern:
-                # Wildcard pattern: *.dill
-                import fnmatch
-                if fnmatch.fnmatch(os.path.basename(path), pattern):
-                    return True
-                if fnmatch.fnmatch(rel_path, pattern):
-                    return True
-            else:
-                # Exact match
-                if rel_path == pattern or rel_path.startswith(pattern + '/'):
-                    return True
-        return False
-    except:
-        return False
+        if size_bytes:
+            pipeline = [tar_cmd, comp_cmd.split(), split_stage(f"{shard_output}.part_", size_bytes)]
+            running.append(start_pipeline(pipeline))
+        else:
+            with open(shard_output, 'wb') as output:
+                running.append(start_pipeline([tar_cmd, comp_cmd.split()], stdout=output))
+    
+    for procs in running:
+        wait_pipeline(procs)
+    
+    return find_archive_files(base_output)
+
+def run_sharded_extract(files, dest, decomp_cmd, workers, index=False):
+    """
+    Unpack the shards of a --shards backup with up to workers tar processes at once
+    
+    Shards hold disjoint top-level entries, so each one is decompressed and
+    unpacked by its own tar; the split parts of a shard are fed to it in order.
+    
+    Args:
+        files (list): Archive files sorted by name (.shardNN and .shardNN.part_xx)
+        dest (str): Destination directory
+        decomp_cmd (str): Decompression command, e.g. "gzip -dc"
+        workers (int): Shards extracted concurrently
+        index (bool): Have each shard's tar write an index (GNU tar) and total them
+    
+    Returns:
+        tuple: (total_bytes, file_count) over all shards, or None without (readable) indexes
+    """
+    shards = collections.defaultdict(list)
+    for path in files:
+        match = SHARD_SUFFIX_RE.search(os.path.basename(path))
+        shards[match.group() if match else ''].append(path)
+    
+    def extract_shard(parts):
+        tar_cmd = ["tar", "--use-compress-program", decomp_cmd, "-xf", "-", "-C", dest]
+        index_path = make_index_file() if index else None
+        if index_path:
+            tar_cmd[1:1] = ["-vv", "--index-file", index_path]
+        try:
+            with feeder_affinity():
+                procs = start_pipeline([tar_cmd], stdin=subprocess.PIPE)
+                feed_parts(parts, procs[0].stdin)
+            wait_pipeline(procs)
+            return index_totals(index_path) if index_path else None
+        finally:
+            if index_path:
+                os.unlink(index_path)
+    
+    print(f"🔀 Extracting {len(shards)} shards, {min(workers, len(shards))} at a time")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        totals = [future.result() for future in [pool.submit(extract_shard, parts) for parts in shards.values()]]
+    if None in totals:
+        return None
+    return sum(t[0] for t in totals), sum(t[1] for t in totals)
 
 def fast_backup(args):
     """Fast backup using native tar command"""
@@ -617,54 +1716,34 @@ def fast_backup(args):
         exclusions.extend(args.exclude)
     print(f"   Total exclusion patterns: {len(exclusions)}")
     
-    # Calculate source size with exclusions applied
-    print(f"\n📊 Stage 3: Calculating source size (applying exclusions on-the-fly)...")
-    print(f"   Scanning directory structure...")
+    # Calculate source size with exclusions applied (tar walks the tree again,
+    # so --no-estimate skips this pass on very large trees)
     source_size = 0
-    file_count = 0
-    dir_count = 0
-    excluded_count = 0
-    
-    # Get absolute base path for exclusion matching
-    base_path = os.path.abspath(source)
-    
-    # Lightweight scan - just count, apply exclusions on-the-fly
-    for root, dirs, files in os.walk(source):
-        # Filter out excluded directories to prevent walking into them
-        dirs[:] = [d for d in dirs if not should_exclude_path(os.path.join(root, d), exclusions, base_path)]
-        dir_count += len(dirs)
-        
-        for file in files:
-            try:
-                file_path = os.path.join(root, file)
-                
-                # Check if file should be excluded
-                if should_exclude_path(file_path, exclusions, base_path):
-                    excluded_count += 1
-                    continue
-                
-                source_size += os.path.getsize(file_path)
-                file_count += 1
-                
-                # Progress indicator every 1000 files to show activity
-                if (file_count + excluded_count) % 1000 == 0:
-                    print(f"   Scanned {file_count} files ({excluded_count} excluded), {dir_count} dirs...", end='\r')
-            except:
-                pass
-    
-    print(f"\n   Total directories: {dir_count}")
-    print(f"   Total files (included): {file_count}")
-    print(f"   Total files (excluded): {excluded_count}")
-    print(f"   Total size (after exclusions): {source_size / (1024**3):.2f} GB ({source_size / (1024**2):.1f} MB)")
+    tar_totals = []
+    if getattr(args, 'no_estimate', False):
+        print(f"\n📊 Stage 3: Skipping source size scan (--no-estimate)")
+        print(f"   tar reports the archived size when it finishes (--totals)")
+        tar_totals = ["--totals"]
+    else:
+        print(f"\n📊 Stage 3: Calculating source size (applying exclusions on-the-fly)...")
+        print(f"   Scanning directory structure...")
+        source_size, file_count, dir_count, excluded_count = scan_source(source, exclusions)
+        print(f"\n   Total directories: {dir_count}")
+        print(f"   Total files (included): {file_count}")
+        print(f"   Total files (excluded): {excluded_count}")
+        print(f"   Total size (after exclusions): {source_size / (1024**3):.2f} GB ({source_size / (1024**2):.1f} MB)")
     
     os.makedirs(dest_dir, exist_ok=True)
     
     # Determine compression method
     print(f"\n🔧 Stage 4: Setting up compression...")
-    compressor = check_dependencies()
-    comp_ext = ".gz" if compressor in ['gzip', 'pigz'] else ".bz2"
+    compressor = check_dependencies(getattr(args, 'compress', None))
+    comp_ext = ".zst" if compressor == 'zstd' else ".gz" if compressor in ['gzip', 'pigz'] else ".bz2"
+    compress_level = get_compression_level(args)
     print(f"   Compressor: {compressor}")
-    print(f"   Threads: {os.cpu_count()}")
+    if compress_level:
+        print(f"   Level: {compress_level}")
+    print(f"   Threads: {CPU_COUNT}")
     print(f"   Extension: {comp_ext}")
     
     # Create exclusion file
@@ -682,15 +1761,32 @@ def fast_backup(args):
         # Get encryption configuration
         encrypt_enabled, password, salt_hex, iterations = get_encryption_config(args)
         
-        # Generate or use provided salt
+        # Fresh salt per CTR backup (see crypto.new_archive_salt); GCM keeps a
+        # configured salt and gets a fresh nonce per backup instead
+        algorithm = nonce = kdf = kdf_params = None
+        encrypt_workers = max(1, getattr(args, 'encrypt_workers', 1))
         if encrypt_enabled:
-            if salt_hex is None:
-                salt_hex = crypto.generate_salt().hex()
+            algorithm = crypto.preferred_cipher()
+            configured_salt = salt_hex
+            salt_hex = crypto.new_archive_salt(algorithm, configured_salt)
+            if algorithm == crypto.GCM_CIPHER:
+                nonce = crypto.generate_nonce()
+            kdf, kdf_params = get_kdf_config(args)
+            if kdf != crypto.KDF_PBKDF2 and algorithm != crypto.GCM_CIPHER:
+                print(f"❌ --kdf {kdf} needs AES-256-GCM (pip install cryptography) - openssl only does PBKDF2")
+                return
             print(f"\n🔐 Encryption Configuration:")
-            print(f"   Algorithm: AES-256-CBC")
-            print(f"   KDF: PBKDF2-SHA256")
-            print(f"   Iterations: {iterations}")
+            print(f"   Algorithm: {algorithm}{' (AEAD)' if nonce else ''}")
+            print(f"   KDF: {crypto.KDF_LABELS[kdf]}")
+            if kdf == crypto.KDF_PBKDF2:
+                print(f"   Iterations: {iterations}")
+                if iterations > crypto.PBKDF2_ITERATIONS_WARN:
+                    print(f"   ⚠️  Over {crypto.PBKDF2_ITERATIONS_WARN} PBKDF2 iterations - --kdf scrypt protects as well for less CPU")
+            else:
+                print(f"   Parameters: {crypto.format_kdf_params({**crypto.DEFAULT_KDF_PARAMS[kdf], **(kdf_params or {})})}")
             print(f"   Salt: {salt_hex[:16]}...")
+            if configured_salt and salt_hex != configured_salt:
+                print(f"   ⚠️  Configured salt ignored - {algorithm} needs a fresh salt per archive (saved in the .enc metadata)")
         
         # Add Unix timestamp prefix to archive name
         timestamp = int(time.time())
@@ -702,6 +1798,7 @@ def fast_backup(args):
             archive_ext += ".enc"
         
         base_output = os.path.join(dest_dir, f"{timestamped_name}.tar{archive_ext}")
+        os.makedirs(os.path.dirname(base_output), exist_ok=True)
         
         print(f"\n📦 Stage 6: Creating backup archive...")
         print(f"   Timestamp: {timestamp}")
@@ -712,17 +1809,37 @@ def fast_backup(args):
         
         start_time = time.time()
         
-        if size_gb and size_gb > 0:
+        shards = getattr(args, 'shards', 1) or 1
+        if shards > 1 and (cloud_type != 'local' or encrypt_enabled):
+            print(f"   ⚠️  --shards is only supported for local, unencrypted backups - using one tar stream")
+            shards = 1
+        
+        if shards > 1:
+            size_bytes = int(size_gb * 1024**3) if size_gb and size_gb > 0 else None
+            outputs = run_sharded_backup(source, base_output, shards, compressor,
+                                         exclude_file, exclusions, size_bytes, level=compress_level)
+            total_size = sum(size for _, size in outputs)
+            
+            print(f"\n📊 Stage 7: Analyzing backup results...")
+            print(f"\n✅ Backup Complete!")
+            print(f"   Files created: {len(outputs)}")
+            print(f"   Total compressed size: {total_size / (1024**3):.2f} GB")
+            if source_size > 0:
+                print(f"   Compression ratio: {(total_size / source_size * 100):.1f}%")
+            print(f"   Extract with: --source {base_output}")
+        
+        elif size_gb and size_gb > 0:
             # Multi-part backup
             size_bytes = int(size_gb * 1024 * 1024 * 1024)
             estimated_parts = int((source_size / size_bytes) + 1)
             
             print(f"\n🧩 Multi-part mode:")
             print(f"   Part size: {size_gb} GB ({size_bytes / (1024**2):.0f} MB)")
-            print(f"   Estimated parts: ~{estimated_parts}")
+            if source_size > 0:
+                print(f"   Estimated parts: ~{estimated_parts}")
             
             # Create tar command with exclusions (using GNU tar)
-            tar_cmd_parts = ["gtar", "-cf", "-", "--no-xattrs", "--no-acls"]
+            tar_cmd_parts = ["gtar", "-cf", "-", "--no-xattrs", "--no-acls"] + tar_totals
             
             if exclude_file:
                 tar_cmd_parts.extend(["--exclude-from", exclude_file])
@@ -730,7 +1847,7 @@ def fast_backup(args):
             tar_cmd_parts.extend(["-C", os.path.dirname(os.path.abspath(source)), source_name])
             
             # Compression and splitting pipeline
-            comp_cmd = get_compression_command(compressor)
+            comp_cmd = get_compression_command(compressor, level=compress_level)
             
             if cloud_type != 'local':
                 # Cloud streaming mode with configurable parts
@@ -745,29 +1862,36 @@ def fast_backup(args):
                 
                 print(f"   📁 Backup folder: {cloud_folder}")
                 
-                # Start tar+gzip pipeline
-                tar_proc = subprocess.Popen(tar_cmd_parts, stdout=subprocess.PIPE)
-                gzip_proc = subprocess.Popen(
-                    comp_cmd.split(),
-                    stdin=tar_proc.stdout,
-                    stdout=subprocess.PIPE
-                )
-                
                 # Stream to cloud with 2GB splits
                 base_filename = f"{os.path.basename(source)}.tar{comp_ext}"
                 
+                # Start tar+gzip pipeline, optionally keeping a local copy of the parts in the same pass
+                pipeline = [tar_cmd_parts, comp_cmd.split()]
+                local_copy = getattr(args, 'local_copy', None)
+                if local_copy:
+                    local_dir = os.path.join(local_copy, str(backup_timestamp))
+                    os.makedirs(local_dir, exist_ok=True)
+                    pipeline.append(tee_stage(os.path.join(local_dir, f"{base_filename}.part_"), size_bytes))
+                    print(f"   💾 Local copy: {local_dir}/{base_filename}.part_*")
+                procs = start_pipeline(pipeline, stdout=subprocess.PIPE)
+                gzip_proc = procs[-1]
+                
                 if cloud_type == 's3':
                     parts = cloud_path.split('/', 1)
                     bucket = parts[0]
                     s3_folder = f"{parts[1]}/{backup_timestamp}" if len(parts) > 1 else str(backup_timestamp)
-                    stream_to_s3(gzip_proc.stdout, bucket, s3_folder, base_filename, part_size_gb=size_gb)
+                    stream_to_s3(gzip_proc.stdout, bucket, s3_folder, base_filename, part_size_gb=size_gb,
+                                 workers=getattr(args, 'upload_workers', 4),
+                                 profile=getattr(args, 'aws_profile', None),
+                                 spool_dir=getattr(args, 'spool_dir', None))
                 elif cloud_type == 'gdrive':
                     stream_to_gdrive(gzip_proc.stdout, cloud_folder, base_filename, part_size_gb=size_gb)
                 elif cloud_type == 'onedrive':
-                    stream_to_onedrive(gzip_proc.stdout, cloud_folder, base_filename, part_size_gb=size_gb)
+                    stream_to_onedrive(gzip_proc.stdout, cloud_folder, base_filename, part_size_gb=size_gb,
+                                       spool_dir=getattr(args, 'spool_dir', None))
                 
-                gzip_proc.wait()
-                tar_proc.wait()
+                gzip_proc.stdout.close()
+                wait_pipeline(procs)
                 
                 print(f"\n   ✅ Cloud backup complete to {cloud_type}:{cloud_folder}")
                 print(f"   📋 To extract, use:")
@@ -779,19 +1903,21 @@ def fast_backup(args):
                     print(f"      python archivedir_fast.py extract onedrive://{cloud_folder}/{base_filename}.part_** ./output")
             else:
                 # Local filesystem mode
-                split_cmd = f"split -b {size_bytes} - \"{base_output}.part_\""
+                split_cmd = split_stage(f"{base_output}.part_", size_bytes)
                 
                 # Build pipeline with optional encryption
                 if encrypt_enabled:
                     # Save encryption metadata
-                    crypto.save_metadata(base_output.replace(comp_ext + '.enc', ''), salt_hex, iterations)
+                    crypto.save_metadata(base_output.replace(comp_ext + '.enc', ''), salt_hex, iterations, algorithm, nonce, kdf, kdf_params)
                     
                     # Pipeline: tar → compress → encrypt → split
-                    encrypt_cmd = crypto.encrypt_pipeline_cmd(password, salt_hex, iterations)
-                    pipeline = f"{' '.join(tar_cmd_parts)} | {comp_cmd} | {encrypt_cmd} | {split_cmd}"
+                    encrypt_cmd, pass_fds = encrypt_stage(password, salt_hex, iterations, algorithm, nonce, kdf, kdf_params,
+                                                        workers=encrypt_workers)
+                    pipeline = [tar_cmd_parts, comp_cmd.split(), encrypt_cmd, split_cmd]
                 else:
                     # Pipeline: tar → compress → split
-                    pipeline = f"{' '.join(tar_cmd_parts)} | {comp_cmd} | {split_cmd}"
+                    pass_fds = ()
+                    pipeline = [tar_cmd_parts, comp_cmd.split(), split_cmd]
                 
                 print(f"\n⏳ Running backup pipeline...")
                 if encrypt_enabled:
@@ -807,15 +1933,15 @@ def fast_backup(args):
                 print(f"   🔧 Using --no-xattrs, --no-acls to suppress warnings")
                 
                 # Run with minimal buffering for memory efficiency
-                run_command(pipeline, capture_output=False)
+                run_pipeline(pipeline, pass_fds=pass_fds)
             
             # Find all parts and report
             print(f"\n📊 Stage 7: Analyzing backup results...")
             print(f"   Scanning for created parts...")
-            parts = sorted(glob.glob(f"{base_output}.part_*"))
+            # One directory scan yields both names and sizes (no per-part stat calls)
+            parts = list_parts(f"{base_output}.part_")
             
-            # Calculate total size efficiently without loading files
-            total_size = sum(os.path.getsize(part) for part in parts)
+            total_size = sum(size for _, size in parts)
             
             print(f"\n✅ Backup Complete!")
             print(f"   Parts created: {len(parts)}")
@@ -828,24 +1954,21 @@ def fast_backup(args):
             # Only list first 10 and last 5 parts to avoid huge output
             if len(parts) > 15:
                 print(f"\n   Part list (showing first 10 and last 5):")
-                for i, part in enumerate(parts[:10], 1):
-                    part_size = os.path.getsize(part) / (1024**2)
-                    print(f"      [{i}] {os.path.basename(part)} - {part_size:.1f} MB")
+                for i, (part, part_size) in enumerate(parts[:10], 1):
+                    print(f"      [{i}] {os.path.basename(part)} - {part_size / (1024**2):.1f} MB")
                 print(f"      ... ({len(parts) - 15} more parts) ...")
-                for i, part in enumerate(parts[-5:], len(parts) - 4):
-                    part_size = os.path.getsize(part) / (1024**2)
-                    print(f"      [{i}] {os.path.basename(part)} - {part_size:.1f} MB")
+                for i, (part, part_size) in enumerate(parts[-5:], len(parts) - 4):
+                    print(f"      [{i}] {os.path.basename(part)} - {part_size / (1024**2):.1f} MB")
             else:
                 print(f"\n   Part list:")
-                for i, part in enumerate(parts, 1):
-                    part_size = os.path.getsize(part) / (1024**2)
-                    print(f"      [{i}] {os.path.basename(part)} - {part_size:.1f} MB")
+                for i, (part, part_size) in enumerate(parts, 1):
+                    print(f"      [{i}] {os.path.basename(part)} - {part_size / (1024**2):.1f} MB")
             
         else:
             # Single file backup
             print(f"\n📦 Single file mode:")
             
-            tar_cmd_parts = ["gtar", "-cf", "-", "--no-xattrs", "--no-acls"]
+            tar_cmd_parts = ["gtar", "-cf", "-", "--no-xattrs", "--no-acls"] + tar_totals
             
             if exclude_file:
                 tar_cmd_parts.extend(["--exclude-from", exclude_file])
@@ -853,18 +1976,20 @@ def fast_backup(args):
             tar_cmd_parts.extend(["-C", os.path.dirname(os.path.abspath(source)), source_name])
             
             # Build pipeline with optional encryption
-            comp_cmd = get_compression_command(compressor)
+            comp_cmd = get_compression_command(compressor, level=compress_level)
             
             if encrypt_enabled:
                 # Save encryption metadata
-                crypto.save_metadata(base_output.replace(comp_ext + '.enc', ''), salt_hex, iterations)
+                crypto.save_metadata(base_output.replace(comp_ext + '.enc', ''), salt_hex, iterations, algorithm, nonce, kdf, kdf_params)
                 
                 # Pipeline: tar → compress → encrypt
-                encrypt_cmd = crypto.encrypt_pipeline_cmd(password, salt_hex, iterations)
-                pipeline = f"{' '.join(tar_cmd_parts)} | {comp_cmd} | {encrypt_cmd} > \"{base_output}\""
+                encrypt_cmd, pass_fds = encrypt_stage(password, salt_hex, iterations, algorithm, nonce, kdf, kdf_params,
+                                                workers=encrypt_workers)
+                pipeline = [tar_cmd_parts, comp_cmd.split(), encrypt_cmd]
             else:
                 # Pipeline: tar → compress
-                pipeline = f"{' '.join(tar_cmd_parts)} | {comp_cmd} > \"{base_output}\""
+                pass_fds = ()
+                pipeline = [tar_cmd_parts, comp_cmd.split()]
             
             print(f"\n⏳ Running backup pipeline...")
             if encrypt_enabled:
@@ -876,7 +2001,8 @@ def fast_backup(args):
                 print(f"   💡 Using streaming pipeline (minimal RAM/disk usage)")
                 print(f"   💡 Data flows directly: disk → tar → compress → disk")
             print(f"   🔧 Using --no-xattrs, --no-acls to suppress warnings")
-            run_command(pipeline, capture_output=False)
+            with open(base_output, 'wb') as output:
+                run_pipeline(pipeline, stdout=output, pass_fds=pass_fds)
             
             print(f"\n📊 Stage 7: Analyzing backup results...")
             file_size = os.path.getsize(base_output)
@@ -896,87 +2022,687 @@ def fast_backup(args):
         if exclude_file and os.path.exists(exclude_file):
             os.unlink(exclude_file)
 
-def check_and_download_onedrive_files(files):
-    """Check if files are OneDrive offline files and trigger download"""
-    print(f"   Checking {len(files)} files for OneDrive status...")
-    onedrive_files = []
+class ProgressReporter:
+    """
+    Once-a-second progress line for a streaming copy
     
-    for idx, file_path in enumerate(files, 1):
+    The copy loop only adds to `bytes_done`; formatting and printing happen on a
+    background thread, so the hot path never pays for an f-string or a print.
+    Copies shorter than one interval print nothing at all.
+    Use as a context manager around the loop.
+    """
+    
+    def __init__(self, label="streamed", interval=1.0):
+        self.label = label
+        self.interval = interval
+        self.bytes_done = 0
+        self._printed = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def _run(self):
+        start = time.time()
+        while not self._stop.wait(self.interval):
+            elapsed = time.time() - start
+            print(f"   📊 {self.bytes_done / (1024**2):.0f} MB {self.label} "
+                  f"({self.bytes_done / (1024**2) / elapsed:.1f} MB/s)", end='\r', flush=True)
+            self._printed = True
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        if self._printed:
+            print()
+
+def fadvise(fd, offset, length, advice):
+    """posix_fadvise with os.POSIX_FADV_<advice> (e.g. 'WILLNEED'); a no-op where unsupported"""
+    posix_fadvise = getattr(os, 'posix_fadvise', None)  # Not available on macOS/Windows
+    if posix_fadvise is None:
+        return
+    try:
+        posix_fadvise(fd, offset, length, getattr(os, f'POSIX_FADV_{advice}'))
+    except OSError:
+        pass
+
+def advise_readahead(fd, offset, length=READAHEAD_SIZE):
+    """Have the kernel start reading [offset, offset + length) of fd in the background"""
+    fadvise(fd, offset, length, 'WILLNEED')
+
+def prefetch_file(path, length=READAHEAD_SIZE):
+    """Start background readahead of the head of path (the next part to be fed)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        advise_readahead(fd, 0, length)
+    finally:
+        os.close(fd)
+
+def copy_to_pipe(src, dst, buffer_size=PIPE_SIZE, progress=None, readahead=READAHEAD_SIZE):
+    """
+    Copy an open file into a pipe or FIFO
+    
+    Uses splice(2) on Linux so the data moves file -> pipe inside the kernel
+    (one syscall per chunk, no copy through Python). Falls back to a buffered
+    read/write loop where splice is unavailable or unsupported by the filesystem.
+    A sliding posix_fadvise(WILLNEED) window keeps the disk busy up to readahead
+    bytes ahead of the splice position, so reads overlap with decompression.
+    The file is read once, front to back: it is marked SEQUENTIAL (larger kernel
+    readahead) and pages already copied are dropped from the page cache
+    (DONTNEED) as the window moves and at the end, so a multi-GB part does not
+    push the rest of the system's cache out.
+    
+    Args:
+        src: Readable file object (regular file)
+        dst: Writable pipe/FIFO file object
+        buffer_size: Bytes per splice/read call
+        progress: Optional ProgressReporter to credit copied bytes to
+        readahead: Bytes to prefetch ahead of the copy (0 leaves it to the kernel)
+    """
+    dst.flush()
+    fd = src.fileno()
+    position = hinted = dropped = 0
+    fadvise(fd, 0, 0, 'SEQUENTIAL')
+    if readahead:
+        advise_readahead(fd, 0, readahead)
+        hinted = readahead
+    try:
+        splice = getattr(os, 'splice', None)  # Python 3.10+, Linux only
+        if splice is not None:
+            try:
+                while n := splice(fd, dst.fileno(), buffer_size):
+                    position += n
+                    if readahead and position > hinted - readahead // 2:
+                        advise_readahead(fd, hinted, readahead)
+                        hinted += readahead
+                        fadvise(fd, dropped, position - dropped, 'DONTNEED')
+                        dropped = position
+                    if progress:
+                        progress.bytes_done += n
+                return
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                    raise
+        # splice advances the fd offset, so the fallback resumes where it stopped
+        while chunk := src.read(buffer_size):
+            dst.write(chunk)
+            if progress:
+                progress.bytes_done += len(chunk)
+    finally:
+        fadvise(fd, dropped, 0, 'DONTNEED')  # 0 = to end of file
+
+def copy_from_pipe(src, dst, limit, buffer_size=PIPE_SIZE):
+    """
+    Copy up to limit bytes from a pipe into a regular file
+    
+    Counterpart of copy_to_pipe: splice(2) moves the data pipe -> file inside the
+    kernel. The fallback reads the raw fd (never src's Python buffer), so later
+    calls can go back to splice without skipping buffered bytes. Streams without
+    a file descriptor use plain read/write.
+    
+    Returns:
+        int: Bytes copied (less than limit only at EOF)
+    """
+    try:
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        src_fd = None
+    
+    copied = 0
+    if src_fd is None:
+        while copied < limit and (chunk := src.read(min(buffer_size, limit - copied))):
+            dst.write(chunk)
+            copied += len(chunk)
+        return copied
+    
+    dst.flush()
+    splice = getattr(os, 'splice', None)  # Python 3.10+, Linux only
+    if splice is not None:
         try:
-            print(f"   [{idx}/{len(files)}] Checking: {os.path.basename(file_path)}", end="")
-            
-            # Check if file is in OneDrive directory
-            if "OneDrive" in file_path or "OneDrive-Comcast" in file_path:
-                print(f" - OneDrive file", end="")
-                # Check if file exists but might be offline (placeholder)
-                file_size = os.path.getsize(file_path)
-                print(f" - Size: {file_size / (1024**2):.1f} MB", end="")
-                
-                # OneDrive offline files are typically very small placeholders
-                # Try to access the file to trigger download
-                if file_size < 1024:  # Less than 1KB might be a placeholder
-                    print(f" - ⚠️  OFFLINE PLACEHOLDER!")
-                    onedrive_files.append(file_path)
+            while copied < limit and (n := splice(src_fd, dst_fd, min(buffer_size, limit - copied))):
+                copied += n
+            return copied
+        except OSError as e:
+            if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                raise
+    while copied < limit and (chunk := os.read(src_fd, min(buffer_size, limit - copied))):
+        os.write(dst_fd, chunk)
+        copied += len(chunk)
+    return copied
+
+def split_suffixes():
+    """
+    Part suffixes in GNU split order: aa..yz, zaaa..zyzz, zzaaaa...
+    
+    The suffix widens instead of running out, and every name sorts after the
+    previous one, so glob + sort still returns the parts in order.
+    """
+    prefix, width = '', 2
+    while True:
+        for letters in itertools.product(string.ascii_lowercase, repeat=width):
+            if letters[0] == 'z':
+                break
+            yield prefix + ''.join(letters)
+        prefix, width = prefix + 'z', width + 1
+
+def split_stage(prefix, size_bytes):
+    """
+    Pipeline stage that cuts its input into prefix + aa, ab, ... files of size_bytes
+    
+    Replaces `split -b`: each part is filled with copy_from_pipe, so the data
+    moves pipe -> file with splice(2) instead of through split's buffers.
+    As with split, empty input creates no files.
+    """
+    def stage(src, dst):
+        for suffix in split_suffixes():
+            path = prefix + suffix
+            with open(path, 'wb') as part:
+                copied = copy_from_pipe(src, part, size_bytes)
+            if copied == 0:
+                os.remove(path)
+            if copied < size_bytes:
+                return
+    stage.label = f"split -b {size_bytes} (in-process)"
+    return stage
+
+def _load_tee():
+    """
+    tee(2) as tee(fd_in, fd_out, length) -> bytes duplicated, or None off Linux
+    
+    The os module has splice but no tee, so it comes from libc (ctypes drops
+    the GIL for the call, like os.splice).
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.tee.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_size_t, ctypes.c_uint]
+        libc.tee.restype = ctypes.c_ssize_t
+    except (OSError, AttributeError):
+        return None
+    
+    def tee(fd_in, fd_out, length):
+        while True:
+            n = libc.tee(fd_in, fd_out, length, 0)
+            if n >= 0:
+                return n
+            err = ctypes.get_errno()
+            if err != errno.EINTR:
+                raise OSError(err, os.strerror(err))
+    return tee
+
+def tee_stage(prefix, size_bytes):
+    """
+    Pipeline stage that passes its input through and keeps a split copy on disk
+    
+    The copy is cut like split_stage (prefix + aa, ab, ...). On Linux, tee(2)
+    (see _load_tee) duplicates the pipe data into the output pipe and splice(2) moves it into
+    the part file, so the bytes never enter user space; elsewhere a read/write
+    loop does both.
+    """
+    def stage(src, dst):
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        dst.flush()
+        suffixes = split_suffixes()
+        part, room = None, size_bytes
+        tee = _load_tee() if hasattr(os, 'splice') else None
+        try:
+            while True:
+                if room == 0:
+                    os.close(part)
+                    part, room = None, size_bytes
+                want = min(PIPE_SIZE, room)
+                if tee is not None:
+                    try:
+                        n = tee(src_fd, dst_fd, want)
+                    except OSError as e:
+                        if e.errno not in (errno.EINVAL, errno.ENOSYS):
+                            raise
+                        tee = None
+                        continue
+                    chunk = None
                 else:
-                    print(f" - ✓ Available")
-                    
-                # Attempt to trigger download by reading file attributes
+                    chunk = os.read(src_fd, want)
+                    n = len(chunk)
+                if n == 0:
+                    break
+                # Opened on first data, so an exact multiple of size_bytes leaves no empty part
+                if part is None:
+                    part = os.open(prefix + next(suffixes), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                if chunk is None:
+                    moved = 0
+                    while moved < n:
+                        moved += os.splice(src_fd, part, n - moved)
+                else:
+                    with memoryview(chunk) as view:
+                        written = 0
+                        while written < n:
+                            written += os.write(dst_fd, view[written:])
+                    os.write(part, chunk)  # Regular files take the whole buffer
+                room -= n
+        finally:
+            if part is not None:
+                os.close(part)
+    stage.label = f"tee + split -b {size_bytes} (in-process)"
+    return stage
+
+def feed_parts(files, stream, buffer_size=PIPE_SIZE):
+    """
+    Stream multi-part archive files, in order, into a writable pipe and close it
+    
+    Call inside feeder_affinity() (with the pipeline started in the same block).
+    """
+    try:
+        for i, part_file in enumerate(files):
+            with open(part_file, 'rb') as part:
+                if i + 1 < len(files):
+                    prefetch_file(files[i + 1])
+                copy_to_pipe(part, stream, buffer_size)
+    except BrokenPipeError:
+        # Downstream exited early - its exit code reports the real error
+        pass
+    finally:
+        try:
+            stream.close()
+        except BrokenPipeError:
+            pass
+
+# Suffix added by `split` (name.part_aa) - stripped to recover the archive name
+PART_SUFFIX_RE = re.compile(r'\.part_[^./]+$')
+# Suffix of a sharded backup stream (name.shard03, name.shard03.part_aa)
+SHARD_SUFFIX_RE = re.compile(r'\.shard\d+(?=\.part_|$)')
+
+def archive_name(path):
+    """Archive file name without shard/split suffixes (x.tar.gz.shard01.part_ab -> x.tar.gz)"""
+    return SHARD_SUFFIX_RE.sub('', PART_SUFFIX_RE.sub('', os.path.basename(path)))
+
+def is_sharded(files):
+    """True if files are the shards of a --shards backup (need tar --ignore-zeros)"""
+    return any(SHARD_SUFFIX_RE.search(os.path.basename(f)) for f in files)
+
+def find_archive_files(source_pattern):
+    """
+    Resolve an extract source to the files that make up the archive
+    
+    Accepts a glob (backup.tar.gz.part_*), any single part (backup.tar.gz.part_aa)
+    or the archive name itself, in which case split parts (and the .shardNN files
+    of a sharded backup) are preferred when present.
+    The directory is scanned once; names are matched with one compiled regex and
+    sizes are taken from the scandir entries.
+    
+    Returns:
+        list: [(path, size_bytes), ...] sorted by name
+    """
+    dirname, name = os.path.split(source_pattern)
+    if '*' not in name:
+        # Any one part or shard stands for the whole archive
+        name = archive_name(name)
+    if '*' in name:
+        matcher = re.compile(fnmatch.translate(name.replace('**', '*')))
+    elif 'part_' in name:
+        # Older layout with the part number mid-name: name.part_aa.tar.gz
+        matcher = re.compile(re.escape(name.split('part_')[0]) + r'part_.*\Z', re.DOTALL)
+    else:
+        matcher = re.compile(re.escape(name) + r'(?:\.shard\d+)?(?:\.part_.*)?\Z', re.DOTALL)
+    
+    whole, parts = [], []
+    try:
+        with os.scandir(dirname or '.') as entries:
+            for entry in entries:
+                if matcher.match(entry.name) and entry.is_file():
+                    item = (os.path.join(dirname, entry.name), entry.stat().st_size)
+                    if entry.name == name and 'part_' not in name:
+                        whole.append(item)
+                    else:
+                        parts.append(item)
+    except FileNotFoundError:
+        return []
+    
+    # A bare archive name with split parts next to it means "extract the parts"
+    return sorted(parts or whole)
+
+def _tree_size_dir(path):
+    """
+    One directory of tree_size
+    
+    Returns:
+        tuple: (bytes, file_count, [subdir_path, ...])
+    """
+    total = 0
+    count = 0
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
                 try:
-                    with open(file_path, 'rb') as f:
-                        f.read(1)  # Read first byte to trigger download
-                except Exception as read_err:
-                    print(f" - ⚠️  Read error: {read_err}")
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                        count += 1
+                except OSError:
+                    pass  # Vanished or unreadable entry
+    except OSError:
+        pass  # Unreadable directory
+    return total, count, subdirs
+
+def tree_size(path, workers=None):
+    """
+    Total size and count of regular files under path
+    
+    Uses os.scandir so file type and size come from the directory entries
+    (one stat per file at most, no separate exists/getsize calls). Directories
+    are read on a thread pool like scan_source, so stat latency on a cold
+    cache overlaps; workers=1 (the default on a single CPU, where the pool
+    only adds overhead on a warm cache) walks serially.
+    
+    Returns:
+        tuple: (total_bytes, file_count)
+    """
+    workers = workers or (CPU_COUNT * 2 if CPU_COUNT > 1 else 1)
+    total = 0
+    count = 0
+    if workers <= 1:
+        pending = [path]
+        while pending:
+            size, files, subdirs = _tree_size_dir(pending.pop())
+            total += size
+            count += files
+            pending.extend(subdirs)
+        return total, count
+    
+    results = queue.Queue()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit(directory):
+            pool.submit(_tree_size_dir, directory).add_done_callback(results.put)
+        
+        submit(path)
+        outstanding = 1
+        while outstanding:
+            size, files, subdirs = results.get().result()
+            outstanding -= 1
+            total += size
+            count += files
+            for directory in subdirs:
+                submit(directory)
+            outstanding += len(subdirs)
+    return total, count
+
+@functools.lru_cache(maxsize=None)
+def is_gnu_tar():
+    """True when tar is GNU tar, which extract needs for --index-file"""
+    try:
+        return b'GNU tar' in subprocess.run(['tar', '--version'], capture_output=True).stdout
+    except OSError:
+        return False
+
+def make_index_file():
+    """Empty temp file (in /dev/shm when available) for tar -vv --index-file"""
+    fd, index_path = tempfile.mkstemp(dir='/dev/shm' if os.path.isdir('/dev/shm') else None,
+                                      prefix="archivedir_index_", suffix=".txt")
+    os.close(fd)
+    return index_path
+
+def index_totals(index_path):
+    """
+    Total size and count of regular files in a tar -vv --index-file listing
+
+    Each member is one line ("-rw-r--r-- user/group SIZE date time name");
+    regular files start with '-', hard links with 'h' (listed with size 0,
+    their data is the target's), so the extraction results come from what
+    tar wrote instead of a walk over the destination.
+
+    Returns:
+        tuple: (total_bytes, file_count), or None when the index is unreadable
+    """
+    total = 0
+    count = 0
+    try:
+        with open(index_path, 'rb') as index:
+            for line in index:
+                if line[:1] in (b'-', b'h'):
+                    total += int(line.split(None, 3)[2])
+                    count += 1
+    except (OSError, ValueError, IndexError):
+        return None
+    return total, count
+
+SPACE_PROBE_FILE = ".archivedir_space_probe"
+
+def check_extraction_space(dest, expected_bytes):
+    """
+    Pre-flight check that dest can hold roughly expected_bytes
+    
+    When free space is comfortably above the estimate (1.5x) nothing is done.
+    Otherwise posix_fallocate on a probe file asks ext4/xfs for real extents,
+    which also catches quotas and reserved blocks that statvfs does not show -
+    a disk that is already too small fails here, up front, instead of hours
+    into the extract. The probe file is removed again before tar runs, so
+    nothing stays reserved: other writers can still fill the disk meanwhile.
+    
+    Args:
+        dest: Extraction directory (must exist)
+        expected_bytes: Estimated output size
+    
+    Returns:
+        bool: False if the filesystem cannot hold the estimate
+    """
+    try:
+        st = os.statvfs(dest)
+    except (OSError, AttributeError):  # statvfs is POSIX only
+        return True
+    free = st.f_bavail * st.f_frsize
+    if free > 1.5 * expected_bytes:
+        return True
+    
+    print(f"💾 Low free space ({free / (1024**3):.2f} GB) - checking room for {expected_bytes / (1024**3):.2f} GB...")
+    probe_path = os.path.join(dest, SPACE_PROBE_FILE)
+    fd = os.open(probe_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(fd, 0, expected_bytes)
+        elif free < expected_bytes:
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+    except OSError as e:
+        if e.errno != errno.ENOSPC and free >= expected_bytes:
+            return True  # fallocate unsupported here (EOPNOTSUPP/EFBIG) - statvfs says it fits
+        print(f"❌ Not enough space in {dest}: need ~{expected_bytes / (1024**3):.2f} GB, "
+              f"have {free / (1024**3):.2f} GB")
+        return False
+    finally:
+        os.close(fd)
+        os.unlink(probe_path)
+    print(f"   ✓ Enough space available")
+    return True
+
+# inotify flags (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+def _load_inotify():
+    """Return libc with inotify_init1/inotify_add_watch, or None when unavailable"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+def wait_for_file_size(file_path, min_size, max_wait_time=300, check_interval=2, on_wait=None):
+    """
+    Block until file_path is at least min_size bytes or max_wait_time elapses
+    
+    On Linux the file is watched with inotify (IN_MODIFY/IN_CLOSE_WRITE/IN_ATTRIB)
+    so the loop sleeps in select() and only stats the file when the kernel reports
+    a change. Elsewhere, or if the watch cannot be set up, it polls every
+    check_interval seconds. A slow safety re-check still runs under inotify for
+    sync clients that update files without generating events.
+    
+    Args:
+        file_path: File to watch
+        min_size: Size in bytes at which the file counts as available
+        max_wait_time: Give up after this many seconds
+        check_interval: Poll interval when inotify is not available
+        on_wait: Optional callback(waited_seconds, current_size) for progress output
+    
+    Returns:
+        tuple: (current_size, waited_seconds) - waited >= max_wait_time means timeout
+    """
+    start_wait = time.time()
+    fd = -1
+    libc = _load_inotify()
+    if libc is not None:
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd >= 0 and libc.inotify_add_watch(
+                fd, os.fsencode(file_path), IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB) < 0:
+            os.close(fd)
+            fd = -1
+    
+    try:
+        while True:
+            current_size = os.path.getsize(file_path)
+            waited = time.time() - start_wait
+            if current_size >= min_size or waited >= max_wait_time:
+                return current_size, waited
+            if on_wait:
+                on_wait(waited, current_size)
+            
+            remaining = max_wait_time - waited
+            if fd >= 0:
+                ready, _, _ = select.select([fd], [], [], min(30, remaining))
+                if ready:
+                    try:
+                        os.read(fd, 64 * 1024)  # Drain queued events
+                    except BlockingIOError:
+                        pass
             else:
-                print(f" - ✓ Local file")
-        except Exception as e:
-            print(f" - ⚠️  Error: {e}")
+                time.sleep(min(check_interval, remaining))
+    finally:
+        if fd >= 0:
+            os.close(fd)
+
+def trigger_download(path):
+    """
+    Ask the sync client to fetch an offline file
+    
+    Reading a placeholder is what hydrates it; a WILLNEED hint makes the kernel
+    start that read in the background without pulling data through Python.
+    """
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                advise_readahead(fd, 0, 0)  # 0 = to end of file
+                return
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+    subprocess.run(['cat', path], capture_output=True, timeout=5)
+
+def _trigger_download_safe(path):
+    """trigger_download for a worker thread: returns the error instead of raising"""
+    try:
+        trigger_download(path)
+    except Exception as e:
+        return e
+    return None
+
+def check_and_download_onedrive_files(file_sizes):
+    """
+    Check if files are OneDrive offline files and trigger download
+    
+    Args:
+        file_sizes (dict): {path: size_bytes} of the archive files, from the
+            directory scan; sizes of downloaded placeholders are updated in place
+    """
+    files = list(file_sizes)
+    print(f"   Checking {len(files)} files for OneDrive status...")
+    onedrive_files = []
+    in_onedrive = {}  # directory -> under a OneDrive folder (parts share a directory)
+    
+    available = local = 0  # Counted, not listed - only placeholders get a line each
+    
+    for idx, file_path in enumerate(files, 1):
+        # Check if file is in OneDrive directory (also matches OneDrive-Comcast etc.)
+        directory = os.path.dirname(file_path)
+        if directory not in in_onedrive:
+            in_onedrive[directory] = "OneDrive" in os.path.abspath(directory)
+        if not in_onedrive[directory]:
+            local += 1
+            continue
+        
+        # OneDrive offline files are typically very small placeholders
+        file_size = file_sizes[file_path]
+        if file_size < 1024:  # Less than 1KB might be a placeholder
+            print(f"   [{idx}/{len(files)}] {os.path.basename(file_path)} - OneDrive file - "
+                  f"Size: {file_size} bytes - ⚠️  OFFLINE PLACEHOLDER!")
+            onedrive_files.append(file_path)
+        else:
+            available += 1
+    
+    if local:
+        print(f"   ✓ {local} local file(s)")
+    if available:
+        print(f"   ✓ {available} OneDrive file(s) available")
     
     if onedrive_files:
         print(f"\n   📥 Found {len(onedrive_files)} OneDrive offline file(s)")
         print(f"   💡 Triggering download and waiting for sync...")
         
-        # Trigger download and wait for files to become available
+        # Trigger all downloads at once so the sync client fetches them in
+        # parallel, then wait for the files to become available in order
         max_wait_time = 300  # 5 minutes maximum wait
-        check_interval = 2   # Check every 2 seconds
+        check_interval = 2   # Poll interval when inotify is unavailable
+        
+        print(f"   🔄 Triggering {len(onedrive_files)} download(s)...")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(16, len(onedrive_files))) as pool:
+            for file_path, error in zip(onedrive_files, pool.map(_trigger_download_safe, onedrive_files)):
+                if error:
+                    print(f"      ⚠️  {os.path.basename(file_path)}: {error}")
         
         for idx, file_path in enumerate(onedrive_files, 1):
             try:
                 print(f"\n   [{idx}/{len(onedrive_files)}] Processing: {os.path.basename(file_path)}")
                 
-                # Trigger download
-                print(f"      🔄 Triggering download...")
-                subprocess.run(['cat', file_path], capture_output=True, timeout=5)
-                
                 # Wait for file to become available (size > 1KB)
-                start_wait = time.time()
-                waited = 0
-                
-                while waited < max_wait_time:
-                    current_size = os.path.getsize(file_path)
-                    
-                    if current_size >= 1024:
-                        # File is now available
-                        print(f"      ✅ Downloaded! Size: {current_size / (1024**2):.1f} MB (waited {waited:.0f}s)")
-                        break
+                def show_wait(waited, current_size):
+                    # Still a placeholder, keep waiting
+                    if waited < 1:
+                        print(f"      ⏳ Waiting for OneDrive sync...", end="")
                     else:
-                        # Still a placeholder, keep waiting
-                        if waited == 0:
-                            print(f"      ⏳ Waiting for OneDrive sync (checking every {check_interval}s)...", end="")
-                        else:
-                            print(f"\r      ⏳ Waiting... {waited:.0f}s elapsed (size: {current_size} bytes)", end="")
-                        
-                        time.sleep(check_interval)
-                        waited = time.time() - start_wait
+                        print(f"\r      ⏳ Waiting... {waited:.0f}s elapsed (size: {current_size} bytes)", end="")
                 
-                # Check if we timed out
-                if waited >= max_wait_time:
-                    print(f"\r      ⚠️  Timeout after {max_wait_time}s - file may still be syncing")
+                current_size, waited = wait_for_file_size(
+                    file_path, 1024, max_wait_time, check_interval, on_wait=show_wait)
+                if current_size >= 1024:
+                    # File is now available
+                    print(f"\r      ✅ Downloaded! Size: {current_size / (1024**2):.1f} MB (waited {waited:.0f}s)")
                 else:
-                    print()  # New line after progress updates
+                    print(f"\r      ⚠️  Timeout after {max_wait_time}s - file may still be syncing")
                     
             except Exception as dl_err:
                 print(f"      ⚠️  Error: {dl_err}")
         
+        # Sizes seen while waiting can predate the end of a download - the other
+        # files kept syncing meanwhile, so take them once all waits are over
+        for file_path in onedrive_files:
+            try:
+                file_sizes[file_path] = os.stat(file_path).st_size
+            except OSError:
+                pass
+        
         print(f"\n   ✅ OneDrive file check complete")
     else:
         print(f"   ✅ All files are local or already synced")
@@ -987,12 +2713,20 @@ def fast_extract(args):
     dest = args.dest
     streaming = not getattr(args, 'no_streaming', False)
     
-    # Check if source is a Google Drive folder ID or URL
+    # Check if source is a Google Drive folder ID or URL, or an S3 key pattern
     is_gdrive = False
+    is_s3 = False
     folder_id = None
     file_pattern = None
     
-    if source_pattern.startswith('gs://') or source_pattern.startswith('gdrive://'):
+    if source_pattern.startswith('s3://'):
+        is_s3 = True
+        # Format: s3://bucket/path/to/name.tar.gz.part_*
+        bucket, _, key_pattern = source_pattern[5:].partition('/')
+        print(f"☁️  S3 source detected")
+        print(f"   Bucket: {bucket}")
+        print(f"   Key pattern: {key_pattern}")
+    elif source_pattern.startswith('gs://') or source_pattern.startswith('gdrive://'):
         is_gdrive = True
         # Extract path and file pattern
         # Format: gs://folder_name/path/to/files/pattern or gs://folder_id/pattern
@@ -1010,7 +2744,6 @@ def fast_extract(args):
         is_gdrive = True
         # Extract folder ID from URL
         # Format: https://drive.google.com/drive/folders/FOLDER_ID?...
-        import re
         match = re.search(r'/folders/([a-zA-Z0-9_-]+)', source_pattern)
         if match:
             folder_id = match.group(1)
@@ -1022,17 +2755,6 @@ def fast_extract(args):
             print(f"❌ Could not extract folder ID from URL: {source_pattern}")
             return
     
-    # Handle different input patterns
-    if not is_gdrive:
-        if "*" not in source_pattern:
-            if "part_" in source_pattern:
-                base = source_pattern.split("part_")[0]
-                source_pattern = base + "part_*"
-            elif source_pattern.endswith((".tar.gz", ".tar.bz2", ".tar.gz.enc", ".tar.bz2.enc")):
-                potential_part = source_pattern + ".part_aa"
-                if os.path.exists(potential_part):
-                    source_pattern = source_pattern + ".part_*"
-    
     print(f"🔍 Looking for files matching: {source_pattern}")
     
     os.makedirs(dest, exist_ok=True)
@@ -1041,7 +2763,24 @@ def fast_extract(args):
     files = []
     file_ids = {}  # Maps filename to file_id for Google Drive
     
-    if is_gdrive:
+    if is_s3:
+        if not HAS_S3:
+            print(f"❌ S3 support not available. Install with: pip install boto3")
+            return
+        
+        try:
+            import boto3
+            profile = getattr(args, 'aws_profile', None)
+            session = boto3.Session(profile_name=profile if profile and profile != 'default' else None)
+            s3_client = session.client('s3')
+            print(f"   📡 Listing objects...")
+            s3_parts = list_s3_parts(s3_client, bucket, key_pattern)
+        except Exception as e:
+            print(f"❌ Error accessing S3: {e}")
+            return
+        file_sizes = dict(s3_parts)
+        files = [key for key, _ in s3_parts]
+    elif is_gdrive:
         if not HAS_GDRIVE:
             print(f"❌ Google Drive support not available. Install with:")
             print(f"   pip install google-api-python-client google-auth-httplib2 google-auth-oauthlib")
@@ -1076,23 +2815,42 @@ def fast_extract(args):
             
             folder_id = current_folder_id
             
+            # Normalize pattern: ** means any characters. Older uploads are named
+            # name.part_aa.tar.gz instead of name.tar.gz.part_aa - accept both layouts
+            normalized_pattern = file_pattern.replace('**', '*')
+            patterns = [normalized_pattern]
+            for ext in ('.tar.gz', '.tar.bz2', '.tar.zst'):
+                if f'{ext}.part_' in normalized_pattern:
+                    patterns.append(normalized_pattern.replace(f'{ext}.part_', f'.part_*{ext}'))
+            
             print(f"   📡 Listing files in folder...")
             
-            # List all files in the target folder first
+            # Let Drive do the coarse filtering: the literal text before the first
+            # wildcard (shared by all patterns) becomes a server-side name prefix
             query = f"'{folder_id}' in parents and trashed=false and mimeType!='application/vnd.google-apps.folder'"
+            name_prefix = os.path.commonprefix([re.split(r'[*?\[]', p, maxsplit=1)[0] for p in patterns])
+            if name_prefix:
+                escaped = name_prefix.replace('\\', '\\\\').replace("'", "\\'")
+                query += f" and name contains '{escaped}'"
             
-            results = service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id, name, size)',
-                orderBy='name',
-                pageSize=1000
-            ).execute()
-            
-            gdrive_files = results.get('files', [])
+            gdrive_files = []
+            page_token = None
+            while True:
+                results = service.files().list(
+                    q=query,
+                    spaces='drive',
+                    fields='nextPageToken, files(id, name, size)',
+                    orderBy='name',
+                    pageSize=1000,
+                    pageToken=page_token
+                ).execute()
+                gdrive_files.extend(results.get('files', []))
+                page_token = results.get('nextPageToken')
+                if not page_token:
+                    break
             
             if not gdrive_files:
-                print(f"❌ No files found in folder")
+                print(f"❌ No files found in folder" + (f" starting with '{name_prefix}'" if name_prefix else ""))
                 return
             
             print(f"   📄 Found {len(gdrive_files)} files in folder:")
@@ -1102,36 +2860,22 @@ def fast_extract(args):
             if len(gdrive_files) > 10:
                 print(f"      ... and {len(gdrive_files) - 10} more files")
             
-            # Filter and sort files using pattern matching
-            import fnmatch
-            # Normalize pattern: ** means any characters
-            normalized_pattern = file_pattern.replace('**', '*')
-            
-            # Try direct match first
+            # Filter with one compiled union of the patterns (one group per pattern)
+            # in a single pass; the direct pattern wins over the alternatives
+            matcher = re.compile('|'.join(f'(?P<p{i}>{fnmatch.translate(p)})' for i, p in enumerate(patterns)))
+            matches = [{} for _ in patterns]
             for gfile in gdrive_files:
-                if fnmatch.fnmatch(gfile['name'], normalized_pattern):
-                    files.append(gfile['name'])
-                    file_ids[gfile['name']] = gfile['id']
+                m = matcher.match(gfile['name'])
+                if m:
+                    matches[int(m.lastgroup[1:])][gfile['name']] = gfile['id']
             
-            # If no matches and pattern has .tar.gz.part_, try swapping to .part_.tar.gz
-            if not files and '.tar.gz.part_' in normalized_pattern:
-                alt_pattern = normalized_pattern.replace('.tar.gz.part_', '.part_*.tar.gz')
-                print(f"   💡 Trying alternative pattern: {alt_pattern}")
-                for gfile in gdrive_files:
-                    if fnmatch.fnmatch(gfile['name'], alt_pattern):
-                        files.append(gfile['name'])
-                        file_ids[gfile['name']] = gfile['id']
-            
-            # Also try .part_*.tar.bz2 for bzip2 archives
-            if not files and '.tar.bz2.part_' in normalized_pattern:
-                alt_pattern = normalized_pattern.replace('.tar.bz2.part_', '.part_*.tar.bz2')
-                print(f"   💡 Trying alternative pattern: {alt_pattern}")
-                for gfile in gdrive_files:
-                    if fnmatch.fnmatch(gfile['name'], alt_pattern):
-                        files.append(gfile['name'])
-                        file_ids[gfile['name']] = gfile['id']
-            
-            files = sorted(files)
+            for pattern, found in zip(patterns, matches):
+                if found:
+                    if pattern != normalized_pattern:
+                        print(f"   💡 Matched alternative pattern: {pattern}")
+                    file_ids = found
+                    files = sorted(found)
+                    break
             
             if not files:
                 print(f"   ⚠️  No files matched pattern: {file_pattern}")
@@ -1143,7 +2887,9 @@ def fast_extract(args):
             print(f"❌ Error accessing Google Drive: {e}")
             return
     else:
-        files = sorted(glob.glob(source_pattern))
+        # Single directory scan: matching, part detection and sizes in one pass
+        file_sizes = dict(find_archive_files(source_pattern))
+        files = list(file_sizes)
     
     if not files:
         print(f"❌ No files found matching pattern: {source_pattern}")
@@ -1157,17 +2903,22 @@ def fast_extract(args):
             print(f"   [{i}] {fname}")
     else:
         for i, f in enumerate(files, 1):
-            print(f"   [{i}] {os.path.basename(f)} ({os.path.getsize(f) / (1024**2):.1f} MB)")
+            print(f"   [{i}] {os.path.basename(f)} ({file_sizes[f] / (1024**2):.1f} MB)")
     
     # Check for encryption
     encrypted = False
     password = None
     salt_hex = None
     iterations = 100000
+    algorithm = None
+    nonce = None
+    chunk_size = None
+    kdf = None
+    kdf_params = None
     
-    # Check if this is an encrypted archive
+    # Check if this is an encrypted archive (name.tar.gz.enc or name.tar.gz.enc.part_aa)
     base_file = files[0]
-    if base_file.endswith('.enc'):
+    if archive_name(base_file).endswith('.enc'):
         encrypted = True
         print(f"\n🔐 Encrypted archive detected")
         
@@ -1175,15 +2926,21 @@ def fast_extract(args):
             print(f"   ❌ crypto.py module not available")
             return
         
-        # Try to load metadata from .enc file (skip for Google Drive)
-        if not is_gdrive:
-            metadata_base = base_file.replace('.enc', '').replace('.part_aa', '').replace('.tar.gz', '').replace('.tar.bz2', '')
+        # Try to load metadata from .enc file (skip for cloud sources)
+        if not (is_gdrive or is_s3):
+            # Metadata sits next to the archive as name.tar.enc
+            metadata_base = base_file.replace('.enc', '').replace('.part_aa', '').replace('.tar.gz', '.tar').replace('.tar.bz2', '.tar').replace('.tar.zst', '.tar')
             try:
                 metadata = crypto.load_metadata(metadata_base)
                 if metadata:
                     salt_hex = metadata.get('salt')
                     iterations = metadata.get('iterations', 100000)
-                    print(f"   ✓ Loaded encryption metadata (iterations: {iterations})")
+                    algorithm = metadata.get('algorithm')
+                    nonce = metadata.get('nonce')
+                    chunk_size = metadata.get('chunk_size')
+                    kdf = metadata.get('kdf')
+                    kdf_params = metadata.get('kdf_params')
+                    print(f"   ✓ Loaded encryption metadata ({algorithm}, {crypto.KDF_LABELS.get(kdf, kdf)}, iterations: {iterations})")
             except Exception as e:
                 print(f"   ⚠️  Could not load metadata: {e}")
         
@@ -1196,26 +2953,87 @@ def fast_extract(args):
         if hasattr(args, 'salt') and args.salt:
             salt_hex = args.salt
         
-        if not salt_hex and not is_gdrive:
+        # Cipher: --cipher, then metadata, then the current default
+        if getattr(args, 'cipher', None):
+            algorithm = args.cipher
+        algorithm = algorithm or crypto.DEFAULT_CIPHER
+        if getattr(args, 'nonce', None):
+            nonce = args.nonce
+        kdf = getattr(args, 'kdf', None) or kdf or crypto.KDF_PBKDF2
+        if getattr(args, 'kdf_params', None):
+            try:
+                kdf_params = crypto.parse_kdf_params(args.kdf_params)
+            except ValueError as e:
+                print(f"   ❌ {e}")
+                return
+        
+        if not salt_hex and not (is_gdrive or is_s3):
             print(f"   ❌ Salt not found in metadata and not provided via --salt")
             return
         
+        if kdf != crypto.KDF_PBKDF2 and algorithm != crypto.GCM_CIPHER:
+            print(f"   ❌ {crypto.KDF_LABELS[kdf]} keys are only used with AES-256-GCM archives")
+            return
+        if kdf == crypto.KDF_ARGON2ID and not crypto.HAS_ARGON2:
+            print(f"   ❌ Argon2id archives need the argon2-cffi package: pip install argon2-cffi")
+            return
+        
+        if algorithm == crypto.GCM_CIPHER:
+            if not crypto.HAS_CRYPTOGRAPHY:
+                print(f"   ❌ AES-256-GCM archives need the cryptography package: pip install cryptography")
+                return
+            if not nonce:
+                print(f"   ❌ Nonce not found in metadata and not provided via --nonce")
+                return
+        
         if salt_hex:
             print(f"   ✓ Decryption configured")
     
     # Check and download OneDrive offline files if needed (only for local files)
-    if not is_gdrive:
+    if not (is_gdrive or is_s3):
         print(f"\n🔍 Stage 1: Checking OneDrive status...")
-        check_and_download_onedrive_files(files)
+        check_and_download_onedrive_files(file_sizes)
+    
+    # The compressed size is a lower bound for what tar will write
+    if not is_gdrive and not check_extraction_space(dest, sum(file_sizes.values())):
+        return
     
     print(f"\n🧩 Stage 2: Starting extraction from: {source_pattern if not is_gdrive else f'Google Drive folder {folder_id}'}")
     
     # Determine decompression method
-    base_name = files[0].replace('.enc', '')
-    if base_name.endswith('.bz2'):
-        decomp_cmd = "pbzip2 -dc" if subprocess.run(['which', 'pbzip2'], capture_output=True).returncode == 0 else "bzip2 -dc"
-    else:
-        decomp_cmd = "pigz -dc" if subprocess.run(['which', 'pigz'], capture_output=True).returncode == 0 else "gzip -dc"
+    decomp_cmd = get_decompression_command(archive_name(files[0]).replace('.enc', ''))
+    
+    # Shards of a --shards backup are separate tar archives - read back to back when
+    # they go through one pipeline (see run_sharded_extract for the parallel path)
+    tar_extract = ["tar", "-xf", "-", "-C", dest]
+    if not is_gdrive and is_sharded(files):
+        print(f"🔀 Sharded backup: {len(files)} file(s)")
+        tar_extract.insert(1, "--ignore-zeros")
+
+    # GNU tar lists what it extracts (-vv) into an index file in RAM, which gives
+    # Stage 3 of a local extraction the size and file count without walking the
+    # destination afterwards
+    index_path = None
+    if not (is_gdrive or is_s3) and is_gnu_tar():
+        index_path = make_index_file()
+        tar_extract[1:1] = ["-vv", "--index-file", index_path]
+
+    # decrypt → decompress → tar, reading the archive bytes from stdin
+    # An openssl decrypt stage gets the password through an inherited pipe
+    # (single use - only one of the extraction paths below runs)
+    extract_pipeline = [decomp_cmd.split(), tar_extract]
+    pass_fds = ()
+    if encrypted:
+        decrypt_cmd, pass_fds = decrypt_stage(password, salt_hex, iterations, algorithm, nonce, chunk_size, kdf, kdf_params,
+                                              workers=max(1, getattr(args, 'decrypt_workers', 1)))
+        extract_pipeline.insert(0, decrypt_cmd)
+    
+    # Local files go to a tar that forks the decompressor itself (no separate
+    # decompression stage, tar's own pipe to it); cloud streams keep extract_pipeline.
+    # The whole command goes to tar, so thread flags (-p N, -P N, -n N) are kept
+    local_pipeline = [["tar", "--use-compress-program", decomp_cmd] + tar_extract[1:]]
+    if encrypted:
+        local_pipeline.insert(0, decrypt_cmd)
     
     start_time = time.time()
     
@@ -1226,156 +3044,142 @@ def fast_extract(args):
         print(f"💡 Will download → extract → delete each part in sequence")
         
         if encrypted:
-            print(f"🔧 Pipeline: download → decrypt → {decomp_cmd.split()[0]} → extract → delete")
+            print(f"🔧 Pipeline: download → decrypt → {decomp_cmd} → extract → delete")
         else:
-            print(f"🔧 Pipeline: download → {decomp_cmd.split()[0]} → extract → delete")
+            print(f"🔧 Pipeline: download → {decomp_cmd} → extract → delete")
         
         print(f"📦 Extracting to: {dest}\n")
         
-        # Use named pipe (FIFO) for streaming extraction
-        import tempfile
-        import threading
-        fifo_path = os.path.join(tempfile.gettempdir(), f"archivedir_fifo_{os.getpid()}")
+        from googleapiclient.http import MediaIoBaseDownload
         
-        # Create FIFO
-        if os.path.exists(fifo_path):
-            os.unlink(fifo_path)
-        os.mkfifo(fifo_path)
+        # The extraction pipeline reads the downloads from its own stdin pipe: no
+        # extractor thread to join (and no timeout cutting a long extraction short)
+        procs = start_pipeline(extract_pipeline, stdin=subprocess.PIPE, pass_fds=pass_fds)
+        stream = procs[0].stdin
+        set_pipe_size(stream.fileno())
         
         try:
-            # Start tar extraction in background
-            def extract_from_fifo():
-                if encrypted:
-                    decrypt_cmd = crypto.decrypt_pipeline_cmd(password, salt_hex, iterations)
-                    extract_cmd = f"{decrypt_cmd} < \"{fifo_path}\" | {decomp_cmd} | tar -xf - -C \"{dest}\""
-                else:
-                    extract_cmd = f"{decomp_cmd} < \"{fifo_path}\" | tar -xf - -C \"{dest}\""
-                subprocess.run(extract_cmd, shell=True, check=False)
-            
-            extractor = threading.Thread(target=extract_from_fifo, daemon=True)
-            extractor.start()
-            
-            # Track bytes written to FIFO
-            bytes_in_fifo = 0
-            fifo_max_size = 3 * 1024**3  # 3GB limit
-            lock = threading.Lock()
-            
-            # Monitor extraction progress to track FIFO consumption
-            def monitor_extraction():
-                nonlocal bytes_in_fifo
-                last_check = time.time()
-                while extractor.is_alive():
-                    time.sleep(1)
-                    # Estimate bytes consumed (FIFO drains as tar extracts)
-                    # This is approximate - FIFO size reduces as data is read
-                    with lock:
-                        # Decay the counter over time as extraction progresses
-                        elapsed = time.time() - last_check
-                        if elapsed > 0:
-                            bytes_in_fifo = max(0, bytes_in_fifo - int(50 * 1024**2 * elapsed))  # Assume ~50MB/s extraction
-                        last_check = time.time()
-            
-            monitor = threading.Thread(target=monitor_extraction, daemon=True)
-            monitor.start()
-            
-            # Download and stream each part through the FIFO
-            with open(fifo_path, 'wb') as fifo:
-                for i, filename in enumerate(files):
-                    file_id = file_ids[filename]
-                    
-                    print(f"📥 [{i+1}/{len(files)}] Downloading: {filename}")
-                    
-                    # Download file directly and stream to FIFO
-                    from googleapiclient.http import MediaIoBaseDownload
-                    import io
-                    request = service.files().get_media(fileId=file_id)
-                    
-                    # Use a buffer for streaming
-                    buffer = io.BytesIO()
-                    downloader = MediaIoBaseDownload(buffer, request, chunksize=10*1024*1024)  # 10MB chunks
-                    
+            # Download and stream each part into the pipeline. Each 10MB chunk is
+            # one write, and the 1MB pipe buffer means ~10 fill/drain rounds per
+            # chunk instead of ~160 with the 64KB default
+            for i, filename in enumerate(files):
+                file_id = file_ids[filename]
+                
+                print(f"📥 [{i+1}/{len(files)}] Downloading: {filename}")
+                
+                # Download file directly and stream to the pipeline
+                request = service.files().get_media(fileId=file_id)
+                
+                # The downloader writes each chunk straight into the pipeline
+                # (no BytesIO staging copy); a full pipe blocks it - tar sets the pace
+                downloader = MediaIoBaseDownload(stream, request, chunksize=10*1024*1024)  # 10MB chunks
+                
+                # Progress is printed by the reporter thread, not per chunk
+                with ProgressReporter("downloaded and streamed") as progress:
                     done = False
                     while not done:
                         status, done = downloader.next_chunk()
-                        if status:
-                            progress = int(status.progress() * 100)
-                            print(f"   📊 Download progress: {progress}%", end='\r')
-                        
-                        # Write buffer to FIFO and reset
-                        buffer.seek(0)
-                        data = buffer.read()
-                        if data:
-                            # Wait if FIFO buffer is too large
-                            while True:
-                                with lock:
-                                    if bytes_in_fifo < fifo_max_size:
-                                        break
-                                print(f"\n   ⏸️  FIFO buffer full ({bytes_in_fifo / (1024**3):.2f} GB), waiting for extraction...", end='\r')
-                                time.sleep(0.5)
-                            
-                            fifo.write(data)
-                            with lock:
-                                bytes_in_fifo += len(data)
-                            buffer.seek(0)
-                            buffer.truncate(0)
-                    
-                    # Write any remaining data
-                    buffer.seek(0)
-                    remaining = buffer.read()
-                    if remaining:
-                        # Wait if FIFO buffer is too large
-                        while True:
-                            with lock:
-                                if bytes_in_fifo < fifo_max_size:
-                                    break
-                            print(f"\n   ⏸️  FIFO buffer full ({bytes_in_fifo / (1024**3):.2f} GB), waiting for extraction...", end='\r')
-                            time.sleep(0.5)
-                        
-                        fifo.write(remaining)
-                        with lock:
-                            bytes_in_fifo += len(remaining)
-                    
-                    print(f"\n   ✅ Downloaded and streamed: {filename}")
-            
-            # Wait for extraction to complete
-            extractor.join(timeout=60)
-            
+                        progress.bytes_done = status.resumable_progress
+                
+                print(f"   ✅ Downloaded and streamed: {filename}")
+        except BrokenPipeError:
+            # Extraction pipeline exited early - its error is printed by wait_pipeline
+            print(f"❌ Extraction stopped before all parts were downloaded")
         finally:
-            if os.path.exists(fifo_path):
-                os.unlink(fifo_path)
+            try:
+                stream.close()
+            except BrokenPipeError:
+                pass
+        
+        # Wait for extraction to complete - however long tar needs after the last part
+        wait_pipeline(procs, check=False)
         
         print(f"\n   🎉 All parts extracted from Google Drive!")
+    
+    # S3 streaming extraction: ranged GETs straight into the pipeline, nothing on disk
+    elif is_s3:
+        print(f"☁️  S3 streaming mode")
+        print(f"📦 Archive: {len(files)} object(s), {sum(file_sizes.values()) / (1024**3):.2f} GB")
+        print(f"🔧 Pipeline: ranged GET → {'decrypt → ' if encrypted else ''}{decomp_cmd} → extract")
+        print(f"📦 Extracting to: {dest}\n")
+        
+        reader = S3PartReader(s3_client, bucket, s3_parts)
+        procs = start_pipeline(extract_pipeline, stdin=subprocess.PIPE, pass_fds=pass_fds)
+        download_error = None
+        try:
+            with ProgressReporter("downloaded and streamed") as progress:
+                while chunk := reader.read():
+                    procs[0].stdin.write(chunk)
+                    progress.bytes_done += len(chunk)
+        except BrokenPipeError:
+            # Extraction pipeline exited early - its error is printed by wait_pipeline
+            print(f"❌ Extraction stopped before all parts were read")
+        except Exception as e:
+            download_error = e
+            # A truncated stream must not look like a whole archive to tar
+            for proc in procs:
+                proc.terminate()
+        finally:
+            reader.close()
+            try:
+                procs[0].stdin.close()
+            except BrokenPipeError:
+                pass
+        
+        # Reap every stage before reporting, whatever happened above
+        completed = wait_pipeline(procs, check=False)
+        if download_error:
+            print(f"❌ S3 download failed: {download_error}")
+            print(f"   ⚠️  Extraction into {dest} is incomplete")
+            return
+        if not completed:
+            print(f"❌ S3 extraction failed - extraction into {dest} is incomplete")
+            return
+        
+        print(f"\n   🎉 All parts extracted from S3!")
         
     # Local file extraction
     else:
+        extract_workers = getattr(args, 'extract_workers', None) or CPU_COUNT
+        walk_dest = index_path is None
+        shard_totals = None
         try:
-            if len(files) == 1:
+            if is_sharded(files) and not encrypted and extract_workers > 1:
+                # Shards are independent archives - unpack them side by side
+                print(f"📦 Sharded archive: {len(files)} file(s)")
+                print(f"📦 Extracting to: {dest}")
+                print(f"⏳ Please wait...\n")
+                # Each shard's tar writes its own index; they are totalled here
+                shard_totals = run_sharded_extract(files, dest, decomp_cmd, extract_workers,
+                                                   index=index_path is not None)
+                walk_dest = shard_totals is None
+                
+            elif len(files) == 1:
                 # Single file extraction
                 print(f"📁 Single file detected: {os.path.basename(files[0])}")
-                archive_size = os.path.getsize(files[0])
+                archive_size = file_sizes[files[0]]
                 print(f"📦 Archive size: {archive_size / (1024**3):.2f} GB")
                 
                 if encrypted:
-                    print(f"🔧 Pipeline: decrypt → {decomp_cmd.split()[0]} → extract")
-                    decrypt_cmd = crypto.decrypt_pipeline_cmd(password, salt_hex, iterations)
-                    extract_cmd = f"{decrypt_cmd} < \"{files[0]}\" | {decomp_cmd} | tar -xf - -C \"{dest}\""
+                    print(f"🔧 Pipeline: decrypt → {decomp_cmd} → extract")
                 else:
                     print(f"🔧 Decompression: {decomp_cmd}")
-                    extract_cmd = f"{decomp_cmd} \"{files[0]}\" | tar -xf - -C \"{dest}\""
                 
                 print(f"📦 Extracting to: {dest}")
                 print(f"⏳ Please wait...\n")
                 
-                run_command(extract_cmd, capture_output=False)
+                # tar (or decrypt) reads the archive file directly as its stdin
+                with open(files[0], 'rb') as archive:
+                    run_pipeline(local_pipeline, stdin=archive, pass_fds=pass_fds)
                 
             else:
                 # Multi-part extraction
                 print(f"📦 Multi-part archive detected: {len(files)} parts")
-                total_size = sum(os.path.getsize(f) for f in files)
+                total_size = sum(file_sizes.values())
                 print(f"📦 Total compressed size: {total_size / (1024**3):.2f} GB")
                 
                 if encrypted:
-                    print(f"🔧 Pipeline: concat → decrypt → {decomp_cmd.split()[0]} → extract")
+                    print(f"🔧 Pipeline: concat → decrypt → {decomp_cmd} → extract")
                 else:
                     print(f"🔧 Decompression: {decomp_cmd}")
                 
@@ -1385,73 +3189,44 @@ def fast_extract(args):
                     print(f"💡 Parts will be processed one at a time")
                     print(f"📦 Extracting to: {dest}\n")
                     
-                    # Use named pipe (FIFO) for streaming extraction
-                    import tempfile
-                    fifo_path = os.path.join(tempfile.gettempdir(), f"archivedir_fifo_{os.getpid()}")
-                    
-                    # Create FIFO
-                    if os.path.exists(fifo_path):
-                        os.unlink(fifo_path)
-                    os.mkfifo(fifo_path)
-                    
-                    try:
-                        # Start tar extraction in background
-                        import threading
-                        
-                        def extract_from_fifo():
-                            if encrypted:
-                                decrypt_cmd = crypto.decrypt_pipeline_cmd(password, salt_hex, iterations)
-                                extract_cmd = f"{decrypt_cmd} < \"{fifo_path}\" | {decomp_cmd} | tar -xf - -C \"{dest}\""
-                            else:
-                                extract_cmd = f"{decomp_cmd} < \"{fifo_path}\" | tar -xf - -C \"{dest}\""
-                            subprocess.run(extract_cmd, shell=True, check=False)
-                        
-                        extractor = threading.Thread(target=extract_from_fifo, daemon=True)
-                        extractor.start()
-                        
-                        # Feed parts into FIFO serially
-                        with open(fifo_path, 'wb') as fifo:
+                    # Same shell-free pipeline as standard mode, fed one part at a time
+                    # through its stdin pipe (splice, no FIFO, no extractor thread)
+                    with feeder_affinity():
+                        procs = start_pipeline(local_pipeline, stdin=subprocess.PIPE, pass_fds=pass_fds)
+                        stream = procs[0].stdin
+                        try:
                             for i, part_file in enumerate(files):
-                                part_size = os.path.getsize(part_file) / (1024**2)
+                                part_size = file_sizes[part_file] / (1024**2)
                                 print(f"📥 [{i+1}/{len(files)}] Processing: {os.path.basename(part_file)} ({part_size:.1f} MB)")
-                                with open(part_file, 'rb') as part:
-                                    bytes_read = 0
-                                    while chunk := part.read(1024 * 1024):  # 1MB chunks
-                                        fifo.write(chunk)
-                                        bytes_read += len(chunk)
-                                print(f"   ✓ Completed {os.path.basename(part_file)}")
-                        
-                        extractor.join(timeout=60)
-                        
-                    finally:
-                        if os.path.exists(fifo_path):
-                            os.unlink(fifo_path)
+                                with open(part_file, 'rb') as part, ProgressReporter() as progress:
+                                    if i + 1 < len(files):
+                                        prefetch_file(files[i + 1])
+                                    copy_to_pipe(part, stream, progress=progress)
+                        except BrokenPipeError:
+                            # Extraction pipeline exited early - its exit code reports the error
+                            print(f"❌ Extraction stopped before all parts were read")
+                        finally:
+                            try:
+                                stream.close()
+                            except BrokenPipeError:
+                                pass
+                    wait_pipeline(procs, check=False)
                 else:
                     # Standard mode: all parts must be present
                     print(f"\n⚡ Standard mode: concatenating all parts at once")
                     print(f"📦 Extracting to: {dest}")
                     print(f"⏳ Please wait...\n")
                     
-                    # Concatenate and extract - keep directory structure
-                    cat_cmd = " ".join([f'cat "{f}"' for f in files])
-                    if encrypted:
-                        decrypt_cmd = crypto.decrypt_pipeline_cmd(password, salt_hex, iterations)
-                        extract_cmd = f"{cat_cmd} | {decrypt_cmd} | {decomp_cmd} | tar -xf - -C \"{dest}\""
-                    else:
-                        extract_cmd = f"{cat_cmd} | {decomp_cmd} | tar -xf - -C \"{dest}\""
-                    
-                    run_command(extract_cmd, capture_output=False)
+                    # Feed the parts straight into tar (no cat processes)
+                    with feeder_affinity():
+                        procs = start_pipeline(local_pipeline, stdin=subprocess.PIPE, pass_fds=pass_fds)
+                        feed_parts(files, procs[0].stdin)
+                    wait_pipeline(procs)
             
             # Calculate extracted size
             print(f"\n📊 Stage 3: Calculating extraction results...")
-            extracted_size = 0
-            file_count = 0
-            for root, dirs, files_list in os.walk(dest):
-                for file in files_list:
-                    file_path = os.path.join(root, file)
-                    if os.path.exists(file_path):
-                        extracted_size += os.path.getsize(file_path)
-                        file_count += 1
+            totals = None if walk_dest else shard_totals or index_totals(index_path)
+            extracted_size, file_count = totals or tree_size(dest)
             
             # Auto-scale size units
             if extracted_size >= 1024**3:
@@ -1468,6 +3243,9 @@ def fast_extract(args):
         except subprocess.CalledProcessError as e:
             print(f"⚠️  Extraction completed with some errors (likely due to archive corruption)")
             print(f"✅ Partial extraction may still be successful - check destination folder")
+        finally:
+            if index_path:
+                os.unlink(index_path)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -1487,22 +3265,46 @@ def main():
     backup_parser.add_argument('--source', required=True, help='Source directory to backup')
     backup_parser.add_argument('--dest', required=True, 
                               help='Destination: local path, s3://bucket/path, gs://folder_id, or onedrive://path')
-    backup_parser.add_argument('--size', type=float, help='Split size in GB (creates multi-part archive)')
+    backup_parser.add_argument('--size', type=float,
+                              help='Split size in GB (creates multi-part archive; S3 rounds it to a multiple of 16MB)')
     backup_parser.add_argument('--exclude', action='append', help='Additional exclusion patterns')
     backup_parser.add_argument('--include-problematic', action='store_true', help='Include potentially problematic files')
     backup_parser.add_argument('--verbose', action='store_true', help='Verbose output')
+    backup_parser.add_argument('--no-estimate', action='store_true',
+                              help='Skip the source size scan before tar (no compression ratio in the summary; '
+                                   'tar prints the archived size at the end instead)')
+    backup_parser.add_argument('--compress', choices=['auto', 'gzip', 'zstd'], default='auto',
+                              help='Compression: multithreaded zstd, gzip (pigz when installed), '
+                                   'or auto = zstd when installed, else gzip (default: auto)')
+    backup_parser.add_argument('--compress-level', '-l', type=int,
+                              help='Compression level, e.g. 1 (fast) to 9 (small); zstd goes up to 19 '
+                                   '(default: COMPRESSION_LEVEL from config.py, else the compressor\'s default)')
+    backup_parser.add_argument('--shards', type=int, default=1,
+                              help='Build N tar streams in parallel, split by top-level entry (local, unencrypted)')
     
     # Encryption options
-    backup_parser.add_argument('--encrypt', action='store_true', help='Enable encryption (AES-256-CBC)')
+    backup_parser.add_argument('--encrypt', action='store_true', help='Enable encryption (AES-256-GCM AEAD; AES-256-CTR via openssl without the cryptography package)')
     backup_parser.add_argument('--password', help='Encryption password (will prompt if not provided)')
-    backup_parser.add_argument('--salt', help='Encryption salt as hex string (generates random if not provided)')
+    backup_parser.add_argument('--salt', help='Encryption salt as hex string for AES-256-GCM (random if not provided; '
+                                              'AES-256-CTR always uses a fresh random salt)')
     backup_parser.add_argument('--iterations', type=int, default=100000, help='PBKDF2 iterations (default: 100000)')
+    backup_parser.add_argument('--kdf', type=str.lower, choices=['pbkdf2', 'scrypt', 'argon2id'],
+                               help='Key derivation function (default: pbkdf2; scrypt/argon2id need AES-256-GCM)')
+    backup_parser.add_argument('--kdf-params', help='scrypt/argon2id parameters, e.g. "n=2**14,r=8,p=1" or "t=3,m=65536,p=4"')
+    backup_parser.add_argument('--encrypt-workers', type=int, default=1,
+                              help='Threads encrypting AES-256-GCM/CTR chunks in parallel (default: 1)')
     
     # Cloud-specific options
     backup_parser.add_argument('--cloud', choices=['s3', 'gdrive', 'onedrive'], 
                               help='Explicitly specify cloud provider (auto-detected from dest if using URL scheme)')
     backup_parser.add_argument('--aws-profile', default='default', 
                               help='AWS profile name (default: default)')
+    backup_parser.add_argument('--upload-workers', type=int, default=4,
+                              help='Parallel S3 part uploads; each holds one part in memory (default: 4)')
+    backup_parser.add_argument('--local-copy', metavar='DIR',
+                              help='With a cloud --dest, also write the parts under DIR in the same pass')
+    backup_parser.add_argument('--spool-dir',
+                              help='Stage each S3 object (or OneDrive part) in this directory and upload it from disk (needs 2x --size free)')
     backup_parser.add_argument('--gdrive-credentials', default='gdrive_credentials.json',
                               help='Google Drive credentials file (default: gdrive_credentials.json)')
     backup_parser.add_argument('--gdrive-token', default='gdrive_token.json',
@@ -1521,6 +3323,18 @@ def main():
     extract_parser.add_argument('--password', help='Decryption password (will prompt if archive is encrypted)')
     extract_parser.add_argument('--salt', help='Decryption salt as hex string (auto-loads from .enc metadata if available)')
     extract_parser.add_argument('--iterations', type=int, help='PBKDF2 iterations (auto-loads from .enc metadata if available)')
+    extract_parser.add_argument('--kdf', type=str.lower, choices=['pbkdf2', 'scrypt', 'argon2id'],
+                                help='Key derivation function (auto-loads from .enc metadata if available)')
+    extract_parser.add_argument('--kdf-params', help='scrypt/argon2id parameters (auto-loads from .enc metadata if available)')
+    extract_parser.add_argument('--cipher', type=str.upper, choices=['AES-256-GCM', 'AES-256-CTR', 'AES-256-CBC'],
+                               help='Cipher the archive was encrypted with (auto-loads from .enc metadata; default: AES-256-CTR)')
+    extract_parser.add_argument('--extract-workers', type=int,
+                               help='Shards of a --shards backup unpacked in parallel (default: CPU count)')
+    extract_parser.add_argument('--decrypt-workers', type=int, default=1,
+                               help='Threads decrypting AES-256-GCM/CTR chunks in parallel (default: 1)')
+    extract_parser.add_argument('--nonce', help='AES-256-GCM nonce prefix as hex string (auto-loads from .enc metadata if available)')
+    extract_parser.add_argument('--aws-profile', default='default',
+                               help='AWS profile name for s3:// sources (default: default)')
     extract_parser.add_argument('--keep-structure', action='store_true', help='Keep original directory structure instead of stripping top level')
     
     args = parser.parse_args()
@@ -35,7 +35,7 @@ EXTRACT_SOURCE = None
 # ==========================================
 
 # Enable encryption (True/False)
-# If True, archives will be encrypted with AES-256-CBC
+# If True, archives will be encrypted with AES-256-GCM (AES-256-CTR without the cryptography package)
 ENCRYPTION_ENABLED = False
 
 # Encryption password (used for key derivation)
@@ -46,6 +46,8 @@ ENCRYPTION_PASSWORD = "0123456789abcdef0123456789abcdef"
 
 # Salt for key derivation (hex string, 32 characters = 16 bytes)
 # If None, a random salt will be generated and saved with metadata
+# Only AES-256-GCM backups use it: AES-256-CTR always gets a fresh random salt,
+# since a reused salt would reuse the keystream
 # Example: ENCRYPTION_SALT = "0123456789abcdef0123456789abcdef"
 # ENCRYPTION_SALT = None
 ENCRYPTION_SALT = "0123456789abcdef0123456789abcdef"
@@ -54,5 +56,13 @@ ENCRYPTION_SALT = "0123456789abcdef0123456789abcdef"
 # Default: 100000 iterations (reasonable balance)
 ENCRYPTION_ITERATIONS = 10000
 
+# Key derivation function: "pbkdf2", "scrypt" or "argon2id"
+# scrypt/argon2id need AES-256-GCM (cryptography package); argon2id also needs argon2-cffi
+ENCRYPTION_KDF = "pbkdf2"
+
+# Parameters for scrypt ("n=2**14,r=8,p=1") or argon2id ("t=3,m=65536,p=4")
+# None uses those defaults
+ENCRYPTION_KDF_PARAMS = None
+
 # Destination folder for extraction
 EXTRACT_DEST = None
\ No newline at end of file
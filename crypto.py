@@ -1,24 +1,118 @@
 #!/usr/bin/env python3
 """
 Encryption/Decryption module for archivedir
-Provides simple AES-256-CBC encryption using OpenSSL
+Provides AES-256-GCM streaming encryption (via the cryptography package) and
+AES-256-CTR/CBC, in-process when cryptography is installed and through
+OpenSSL otherwise (systems without it, older archives)
 """
 
 import os
+import re
+import atexit
+import functools
 import sys
 import subprocess
+import shutil
 import secrets
 import hashlib
 import getpass
+import struct
+import queue
+import threading
+import collections
+import concurrent.futures
 
+# Optional: in-process AES via the cryptography package (OpenSSL EVP underneath)
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from cryptography.hazmat.primitives import padding
+    from cryptography.exceptions import InvalidTag
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
 
+# Optional: Argon2id key derivation
+try:
+    from argon2.low_level import hash_secret_raw, Type as Argon2Type
+    HAS_ARGON2 = True
+except ImportError:
+    HAS_ARGON2 = False
+
+# New archives use GCM (authenticated, needs cryptography). Without cryptography
+# they use CTR through the openssl binary. CBC is kept for older archives. With
+# cryptography installed CTR and CBC run in-process, byte-identical to openssl.
+GCM_CIPHER = 'AES-256-GCM'
+DEFAULT_CIPHER = 'AES-256-CTR'
+LEGACY_CIPHER = 'AES-256-CBC'
+OPENSSL_CIPHERS = (DEFAULT_CIPHER, LEGACY_CIPHER)
+SUPPORTED_CIPHERS = (GCM_CIPHER,) + OPENSSL_CIPHERS
+
+# GCM streams are sealed in fixed-size chunks: ciphertext || 16-byte tag each
+GCM_CHUNK_SIZE = 1024 * 1024  # 1MB
+GCM_TAG_SIZE = 16
+
+# Key derivation functions. scrypt/Argon2id keys only feed the in-process GCM
+# cipher - openssl enc can only do PBKDF2.
+KDF_PBKDF2 = 'pbkdf2'
+KDF_SCRYPT = 'scrypt'
+KDF_ARGON2ID = 'argon2id'
+KDF_CHOICES = (KDF_PBKDF2, KDF_SCRYPT, KDF_ARGON2ID)
+KDF_LABELS = {KDF_PBKDF2: 'PBKDF2-SHA256', KDF_SCRYPT: 'scrypt', KDF_ARGON2ID: 'Argon2id'}
+DEFAULT_KDF_PARAMS = {
+    KDF_SCRYPT: {'n': 2**14, 'r': 8, 'p': 1},      # 16MB
+    KDF_ARGON2ID: {'t': 3, 'm': 65536, 'p': 4},    # 64MB (m in KiB)
+}
+# PBKDF2-SHA256 iterations beyond which a memory-hard KDF is the better trade (OWASP: 600k)
+PBKDF2_ITERATIONS_WARN = 600000
+
+# Chunks read ahead of the cipher, so reading the archive overlaps with AES
+READ_AHEAD_CHUNKS = 4
+
+
+@functools.lru_cache(maxsize=None)
 def check_openssl():
-    """Check if OpenSSL is available"""
+    """Check if OpenSSL is available (PATH is searched once per process)"""
+    return shutil.which('openssl') is not None
+
+
+def preferred_cipher():
+    """Cipher for new archives: GCM when cryptography is installed, else openssl CTR"""
+    return GCM_CIPHER if HAS_CRYPTOGRAPHY else DEFAULT_CIPHER
+
+
+def openssl_cipher_flag(algorithm):
+    """Map an algorithm name from metadata (AES-256-CTR) to the openssl flag (-aes-256-ctr)"""
+    if algorithm.upper() not in OPENSSL_CIPHERS:
+        raise ValueError(f"Unsupported openssl cipher: {algorithm}")
+    return f"-{algorithm.lower()}"
+
+
+def password_pipe(password):
+    """
+    Hand a password to a child process without putting it on the command line
+    
+    Returns the read end of a pipe that already holds the password, for use with
+    `openssl -pass fd:N` and Popen(pass_fds=(N,)). The caller closes it once the
+    child has started. Single use: openssl consumes the contents.
+    
+    Args:
+        password (str): Password to pass
+    
+    Returns:
+        int: Readable file descriptor
+    """
+    read_fd, write_fd = os.pipe()
     try:
-        result = subprocess.run(['which', 'openssl'], capture_output=True, check=True)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+        os.write(write_fd, password.encode() + b'\n')
+    finally:
+        os.close(write_fd)
+    return read_fd
+
+
+def _pass_arg(password, pass_fd):
+    """openssl -pass argument: inherited fd when given, inline password otherwise"""
+    return f"fd:{pass_fd}" if pass_fd is not None else f"pass:{password}"
 
 
 def generate_salt():
@@ -26,25 +120,128 @@ def generate_salt():
     return secrets.token_bytes(16).hex()
 
 
-def derive_key(password, salt_hex, iterations=100000):
+def new_archive_salt(algorithm, salt=None):
     """
-    Derive encryption key from password using PBKDF2-SHA256
+    Salt for a new archive written with algorithm
+    
+    CTR derives both key and IV from password + salt (openssl -pbkdf2 -S, and
+    encrypt_stream likewise), so two archives with the same password and salt
+    would share one keystream - XORing them gives the XOR of the plaintexts.
+    CTR and CBC archives therefore always get a fresh random salt, which the
+    .enc metadata records for extraction. GCM draws a random nonce per archive
+    and keeps a configured salt.
+    
+    Args:
+        algorithm (str): Cipher of the new archive
+        salt (str): Configured or --salt hex salt, or None
+    
+    Returns:
+        str: Hex salt to encrypt and save in the metadata with
+    """
+    if salt is None or algorithm.upper() != GCM_CIPHER:
+        return generate_salt()
+    return salt
+
+
+def generate_nonce():
+    """Generate a random 7-byte GCM nonce prefix and return as hex string"""
+    return secrets.token_bytes(7).hex()
+
+
+def pbkdf2_accelerated():
+    """
+    True if hashlib.pbkdf2_hmac runs in OpenSSL >= 1.1.1 (C loop, SHA-NI where the CPU has it)
+    
+    Python builds without OpenSSL fall back to a pure-Python PBKDF2 that is
+    orders of magnitude slower at 100k iterations.
+    """
+    import ssl
+    return hashlib.pbkdf2_hmac.__module__ == '_hashlib' and ssl.OPENSSL_VERSION_INFO >= (1, 1, 1)
+
+
+@functools.lru_cache(maxsize=8)
+def _pbkdf2(password, salt, iterations, dklen):
+    """
+    PBKDF2-SHA256, memoized so every shard/stage of one run derives a key once
+    
+    Takes password as bytes so the cache key is exact; the cache is dropped at exit.
+    """
+    return hashlib.pbkdf2_hmac('sha256', password, salt, iterations, dklen)
+
+atexit.register(_pbkdf2.cache_clear)
+
+
+@functools.lru_cache(maxsize=8)
+def _memory_hard(password, salt, kdf, params):
+    """scrypt/Argon2id counterpart of _pbkdf2 (params is a sorted tuple of items)"""
+    params = dict(params)
+    if kdf == KDF_SCRYPT:
+        n, r, p = params['n'], params['r'], params['p']
+        return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p,
+                              maxmem=128 * r * (n + p + 2) + 1024 * 1024, dklen=32)
+    if not HAS_ARGON2:
+        raise ValueError("Argon2id needs the argon2-cffi package: pip install argon2-cffi")
+    return hash_secret_raw(password, salt, time_cost=params['t'], memory_cost=params['m'],
+                           parallelism=params['p'], hash_len=32, type=Argon2Type.ID)
+
+atexit.register(_memory_hard.cache_clear)
+
+
+def parse_kdf_params(text):
+    """
+    Parse --kdf-params text such as "n=2**14,r=8,p=1" into a dict of ints
+    
+    Raises:
+        ValueError: Malformed pair or non-integer value
+    """
+    params = {}
+    for pair in filter(None, (p.strip() for p in (text or '').split(','))):
+        name, sep, value = pair.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid KDF parameter '{pair}' (expected name=value)")
+        base, _, exponent = value.strip().partition('**')
+        try:
+            params[name.strip()] = int(base) ** int(exponent) if exponent else int(base)
+        except ValueError:
+            raise ValueError(f"Invalid KDF parameter value '{value}'") from None
+    return params
+
+
+def format_kdf_params(params):
+    """Inverse of parse_kdf_params"""
+    return ','.join(f"{name}={value}" for name, value in sorted(params.items()))
+
+
+def derive_key(password, salt_hex, iterations=100000, kdf=KDF_PBKDF2, kdf_params=None):
+    """
+    Derive encryption key from password using PBKDF2-SHA256, scrypt or Argon2id
     
     Args:
         password (str): User password
         salt_hex (str): 32-character hex string (16 bytes)
         iterations (int): Number of PBKDF2 iterations
+        kdf (str): One of KDF_CHOICES
+        kdf_params (dict): scrypt (n, r, p) or Argon2id (t, m, p) overrides
     
     Returns:
         bytes: 32-byte encryption key
     """
     salt = bytes.fromhex(salt_hex)
-    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    if kdf == KDF_PBKDF2:
+        return _pbkdf2(password.encode(), salt, iterations, 32)
+    if kdf not in DEFAULT_KDF_PARAMS:
+        raise ValueError(f"Unsupported KDF: {kdf}")
+    params = {**DEFAULT_KDF_PARAMS[kdf], **(kdf_params or {})}
+    return _memory_hard(password.encode(), salt, kdf, tuple(sorted(params.items())))
 
 
-def encrypt_file(input_file, output_file, password, salt=None, iterations=100000):
+def encrypt_file(input_file, output_file, password, salt=None, iterations=100000, algorithm=DEFAULT_CIPHER):
     """
-    Encrypt a file using AES-256-CBC with OpenSSL
+    Encrypt a file using AES-256 with OpenSSL
+    
+    Runs in-process (encrypt_stream) when cryptography is installed, so no
+    openssl process is spawned per file and openssl is not needed at all; the
+    output is the same either way.
     
     Args:
         input_file (str): Path to input file
@@ -52,26 +249,31 @@ def encrypt_file(input_file, output_file, password, salt=None, iterations=100000
         password (str): Encryption password
         salt (str): Hex salt (32 chars). If None, generates random
         iterations (int): PBKDF2 iterations
+        algorithm (str): AES-256-CTR (default) or AES-256-CBC
     
     Returns:
         str: Hex salt used
     """
-    if not check_openssl():
-        raise RuntimeError("OpenSSL not found. Please install OpenSSL.")
-    
     # Generate or parse salt
     if salt is None:
-        salt_bytes = generate_salt()
-        salt = salt_bytes.hex()
+        salt = generate_salt()
     else:
         # Validate hex salt
         if len(salt) != 32:
             raise ValueError("Salt must be 32 hex characters (16 bytes)")
-        salt_bytes = bytes.fromhex(salt)
+        bytes.fromhex(salt)
+    
+    openssl_cipher_flag(algorithm)  # Validates the algorithm on both paths
+    if HAS_CRYPTOGRAPHY:
+        with open(input_file, 'rb') as src, open(output_file, 'wb') as dst:
+            encrypt_stream(src, dst, password, salt, iterations, algorithm=algorithm)
+        return salt
+    if not check_openssl():
+        raise RuntimeError("OpenSSL not found. Please install OpenSSL or the cryptography package.")
     
     # Build OpenSSL command
     cmd = [
-        'openssl', 'enc', '-aes-256-cbc', '-pbkdf2',
+        'openssl', 'enc', openssl_cipher_flag(algorithm), '-pbkdf2',
         '-iter', str(iterations),
         '-salt', '-S', salt,
         '-in', input_file,
@@ -80,17 +282,17 @@ def encrypt_file(input_file, output_file, password, salt=None, iterations=100000
     ]
     
     # Execute encryption
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     
     if result.returncode != 0:
-        raise RuntimeError(f"Encryption failed: {result.stderr}")
+        raise RuntimeError(f"Encryption failed: {result.stderr.decode(errors='replace')}")
     
     return salt
 
 
-def decrypt_file(input_file, output_file, password, salt, iterations=100000):
+def decrypt_file(input_file, output_file, password, salt, iterations=100000, algorithm=DEFAULT_CIPHER):
     """
-    Decrypt a file using AES-256-CBC with OpenSSL
+    Decrypt a file using AES-256 with OpenSSL (in-process when possible, see encrypt_file)
     
     Args:
         input_file (str): Path to encrypted input file
@@ -98,20 +300,30 @@ def decrypt_file(input_file, output_file, password, salt, iterations=100000):
         password (str): Decryption password
         salt (str): Hex salt (32 chars)
         iterations (int): PBKDF2 iterations
+        algorithm (str): Cipher the file was encrypted with (see load_metadata)
     
     Returns:
         bool: True if successful
-    """
-    if not check_openssl():
-        raise RuntimeError("OpenSSL not found. Please install OpenSSL.")
     
+    Raises:
+        ValueError: Bad salt, or wrong password / damaged file (in-process CBC)
+        RuntimeError: openssl failed or is missing without cryptography
+    """
     # Validate hex salt
     if len(salt) != 32:
         raise ValueError("Salt must be 32 hex characters (16 bytes)")
     
+    openssl_cipher_flag(algorithm)  # Validates the algorithm on both paths
+    if HAS_CRYPTOGRAPHY:
+        with open(input_file, 'rb') as src, open(output_file, 'wb') as dst:
+            decrypt_stream(src, dst, password, salt, iterations, algorithm=algorithm)
+        return True
+    if not check_openssl():
+        raise RuntimeError("OpenSSL not found. Please install OpenSSL or the cryptography package.")
+    
     # Build OpenSSL command
     cmd = [
-        'openssl', 'enc', '-d', '-aes-256-cbc', '-pbkdf2',
+        'openssl', 'enc', '-d', openssl_cipher_flag(algorithm), '-pbkdf2',
         '-iter', str(iterations),
         '-salt', '-S', salt,
         '-in', input_file,
@@ -120,15 +332,15 @@ def decrypt_file(input_file, output_file, password, salt, iterations=100000):
     ]
     
     # Execute decryption
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
     
     if result.returncode != 0:
-        raise RuntimeError(f"Decryption failed: {result.stderr}")
+        raise RuntimeError(f"Decryption failed: {result.stderr.decode(errors='replace')}")
     
     return True
 
 
-def encrypt_pipeline_cmd(password, salt, iterations=100000):
+def encrypt_pipeline_cmd(password, salt, iterations=100000, algorithm=DEFAULT_CIPHER, pass_fd=None):
     """
     Generate OpenSSL encryption command for pipeline use
     
@@ -136,14 +348,17 @@ def encrypt_pipeline_cmd(password, salt, iterations=100000):
         password (str): Encryption password
         salt (str): Hex salt (32 chars)
         iterations (int): PBKDF2 iterations
+        algorithm (str): AES-256-CTR (default) or AES-256-CBC
+        pass_fd (int): Read the password from this inherited fd (see password_pipe)
     
     Returns:
         str: OpenSSL command string for piping
     """
-    return f"openssl enc -aes-256-cbc -pbkdf2 -iter {iterations} -salt -S {salt} -pass pass:{password}"
+    return (f"openssl enc {openssl_cipher_flag(algorithm)} -pbkdf2 -iter {iterations} "
+            f"-salt -S {salt} -pass {_pass_arg(password, pass_fd)}")
 
 
-def decrypt_pipeline_cmd(password, salt, iterations=100000):
+def decrypt_pipeline_cmd(password, salt, iterations=100000, algorithm=DEFAULT_CIPHER, pass_fd=None):
     """
     Generate OpenSSL decryption command for pipeline use
     
@@ -151,14 +366,345 @@ def decrypt_pipeline_cmd(password, salt, iterations=100000):
         password (str): Decryption password
         salt (str): Hex salt (32 chars)
         iterations (int): PBKDF2 iterations
+        algorithm (str): Cipher the archive was encrypted with (see load_metadata)
+        pass_fd (int): Read the password from this inherited fd (see password_pipe)
     
     Returns:
         str: OpenSSL command string for piping
     """
-    return f"openssl enc -d -aes-256-cbc -pbkdf2 -iter {iterations} -salt -S {salt} -pass pass:{password}"
+    return (f"openssl enc -d {openssl_cipher_flag(algorithm)} -pbkdf2 -iter {iterations} "
+            f"-salt -S {salt} -pass {_pass_arg(password, pass_fd)}")
+
 
+STREAM_CHUNK_SIZE = 256 * 1024  # 256KB
+OPENSSL_MAGIC = b'Salted__'
 
-def save_metadata(output_path, salt, iterations):
+
+def openssl_key_iv(password, salt, iterations=100000):
+    """
+    Derive the key and IV exactly as `openssl enc -pbkdf2 -S <salt>` does
+    
+    OpenSSL only uses the first 8 bytes of the -S salt and takes a 48-byte
+    PBKDF2-SHA256 output as 32-byte key + 16-byte IV.
+    
+    Returns:
+        tuple: (key, iv, salt8)
+    """
+    salt8 = bytes.fromhex(salt)[:8]
+    # Both 32-byte output blocks are computed in one OpenSSL call: hashlib has no
+    # per-block entry point (pbkdf2_hmac(salt + INT(i)) is a different function),
+    # and a Python HMAC loop per block would be slower than the serial C loop
+    key_iv = _pbkdf2(password.encode(), salt8, iterations, 48)
+    return key_iv[:32], key_iv[32:], salt8
+
+
+def stream_cipher_available(algorithm=DEFAULT_CIPHER):
+    """True if algorithm can run in-process (needs cryptography; GCM, CTR or CBC)"""
+    return HAS_CRYPTOGRAPHY and algorithm.upper() in SUPPORTED_CIPHERS
+
+
+def _cbc_stream(key, iv, src, dst, decrypt=False, pending=b''):
+    """
+    Run src through AES-256-CBC with PKCS#7 padding, as openssl enc does
+    
+    Raises:
+        ValueError: Bad padding on decrypt - wrong password or damaged archive
+    """
+    cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
+    if decrypt:
+        first, second = cipher.decryptor(), padding.PKCS7(128).unpadder()
+    else:
+        first, second = padding.PKCS7(128).padder(), cipher.encryptor()
+    if pending:
+        dst.write(second.update(first.update(pending)))
+    while chunk := src.read(STREAM_CHUNK_SIZE):
+        dst.write(second.update(first.update(chunk)))
+    try:
+        dst.write(second.update(first.finalize()) + second.finalize())
+    except ValueError:
+        raise ValueError("Bad decrypt - wrong password or damaged archive") from None
+
+
+def _ctr_stream(cipher_ctx, src, dst, pending=b''):
+    """Run src through an AES-CTR context into dst in STREAM_CHUNK_SIZE memoryviews"""
+    in_buf = bytearray(STREAM_CHUNK_SIZE)
+    out_buf = bytearray(STREAM_CHUNK_SIZE + 16)
+    in_view, out_view = memoryview(in_buf), memoryview(out_buf)
+    if pending:
+        dst.write(cipher_ctx.update(pending))
+    while n := src.readinto(in_buf):
+        written = cipher_ctx.update_into(in_view[:n], out_buf)
+        dst.write(out_view[:written])
+    dst.write(cipher_ctx.finalize())
+
+
+def _ctr_parallel(src, dst, key, iv, workers, head=b''):
+    """
+    AES-CTR src into dst in GCM_CHUNK_SIZE windows on workers threads
+    
+    Every window starts on a block boundary, so its counter is iv + offset / 16
+    and windows need no state from each other (CTR encrypt and decrypt are the same).
+    """
+    iv_int = int.from_bytes(iv, 'big')
+    
+    def run_window(offset, data):
+        counter = (iv_int + offset // 16) % (1 << 128)
+        return Cipher(algorithms.AES(key), modes.CTR(counter.to_bytes(16, 'big'))).encryptor().update(data)
+    
+    def windows():
+        offset = 0
+        data = head + _read_full(src, GCM_CHUNK_SIZE - len(head))
+        while data:
+            yield run_window, offset, data
+            offset += len(data)
+            data = _read_full(src, GCM_CHUNK_SIZE)
+    
+    _write_ordered(dst, windows(), workers)
+
+
+def encrypt_stream(src, dst, password, salt, iterations=100000, workers=1, algorithm=DEFAULT_CIPHER):
+    """
+    Encrypt a byte stream in-process with AES-256-CTR (or legacy AES-256-CBC)
+    
+    Output is byte-identical to `openssl enc -aes-256-ctr -pbkdf2 -iter N -S <salt>`
+    (OpenSSL 3 writes no Salted__ header when -S is given), so archives stay
+    decryptable with plain openssl. The same derivation means the same
+    keystream for the same password and salt: use a salt from
+    new_archive_salt, never one shared between streams.
+    
+    Args:
+        src: Readable binary file object (readinto)
+        dst: Writable binary file object
+        password (str): Encryption password
+        salt (str): Hex salt
+        iterations (int): PBKDF2 iterations
+        workers (int): Threads encrypting GCM_CHUNK_SIZE windows in parallel (CTR only)
+        algorithm (str): AES-256-CTR or AES-256-CBC
+    """
+    key, iv, _ = openssl_key_iv(password, salt, iterations)
+    if algorithm.upper() == LEGACY_CIPHER:
+        _cbc_stream(key, iv, src, dst)
+        return
+    if workers <= 1:
+        _ctr_stream(Cipher(algorithms.AES(key), modes.CTR(iv)).encryptor(), src, dst)
+        return
+    _ctr_parallel(src, dst, key, iv, workers)
+
+
+def decrypt_stream(src, dst, password, salt, iterations=100000, workers=1, algorithm=DEFAULT_CIPHER):
+    """
+    Decrypt an AES-256-CTR (or AES-256-CBC) stream produced by encrypt_stream or openssl
+    
+    A leading Salted__ header for the same salt (written by older OpenSSL
+    versions) is skipped.
+    
+    Args:
+        src: Readable binary file object (readinto)
+        dst: Writable binary file object
+        password (str): Decryption password
+        salt (str): Hex salt
+        iterations (int): PBKDF2 iterations
+        workers (int): Threads decrypting GCM_CHUNK_SIZE windows in parallel (CTR only)
+        algorithm (str): AES-256-CTR or AES-256-CBC
+    
+    Raises:
+        ValueError: Bad CBC padding - wrong password or damaged archive
+    """
+    key, iv, salt8 = openssl_key_iv(password, salt, iterations)
+    header = b''
+    while len(header) < 16 and (chunk := src.read(16 - len(header))):
+        header += chunk
+    if header == OPENSSL_MAGIC + salt8:
+        header = b''
+    if algorithm.upper() == LEGACY_CIPHER:
+        _cbc_stream(key, iv, src, dst, decrypt=True, pending=header)
+        return
+    if workers <= 1:
+        _ctr_stream(Cipher(algorithms.AES(key), modes.CTR(iv)).decryptor(), src, dst, pending=header)
+        return
+    _ctr_parallel(src, dst, key, iv, workers, head=header)
+
+
+def _write_ordered(dst, jobs, workers=1):
+    """
+    Write fn(*args) for each (fn, *args) in jobs to dst, in order
+    
+    With workers > 1 the jobs run on a thread pool with at most 2 * workers
+    results in flight, so memory stays bounded while dst gets them in sequence.
+    The jobs generator is closed on the way out, even after an error.
+    """
+    try:
+        if workers <= 1:
+            for fn, *args in jobs:
+                dst.write(fn(*args))
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = collections.deque()
+            for fn, *args in jobs:
+                pending.append(pool.submit(fn, *args))
+                if len(pending) >= 2 * workers:
+                    dst.write(pending.popleft().result())
+            while pending:
+                dst.write(pending.popleft().result())
+    finally:
+        jobs.close()
+
+
+def _gcm_nonce(prefix, counter, last):
+    """12-byte chunk nonce: 7-byte prefix || 32-bit chunk counter || final-chunk flag"""
+    if counter >= 2**32:
+        raise ValueError("GCM stream too long for the chunk counter")
+    return prefix + struct.pack('>I', counter) + (b'\x01' if last else b'\x00')
+
+
+def _read_full(src, size):
+    """Read exactly size bytes unless EOF comes first"""
+    data = src.read(size)
+    while data and len(data) < size:
+        more = src.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def _read_ahead(src, size, depth=READ_AHEAD_CHUNKS):
+    """
+    Yield size-byte chunks of src read on a producer thread
+    
+    A bounded queue keeps at most depth chunks in flight, so the next chunk is
+    read from the pipe while the current one is encrypted. Yields b'' at EOF
+    forever so callers can use next(chunks) as a read.
+    
+    Closing the generator (the consumer gave up, e.g. on a GCM authentication
+    failure or a broken pipe) stops the producer and drops the queued chunks.
+    """
+    chunks = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    
+    def put(item):
+        # A full queue is retried until the consumer has gone, never waited on forever
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def producer():
+        try:
+            while chunk := _read_full(src, size):
+                if not put(chunk):
+                    return
+            put(b'')
+        except Exception as e:
+            put(e)
+    
+    threading.Thread(target=producer, daemon=True).start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            if not chunk:
+                break
+            yield chunk
+        while True:
+            yield b''
+    finally:
+        stop.set()
+        while not chunks.empty():
+            chunks.get_nowait()
+
+
+def gcm_encrypt_stream(src, dst, password, salt, iterations=100000, nonce=None, chunk_size=GCM_CHUNK_SIZE,
+                       kdf=KDF_PBKDF2, kdf_params=None, workers=1):
+    """
+    Encrypt a byte stream with AES-256-GCM in independently sealed chunks
+    
+    Each chunk_size block of plaintext is written as ciphertext || tag under its
+    own nonce (prefix, chunk counter, final flag), so reordered, altered or
+    truncated data fails authentication on decrypt. Key comes from derive_key.
+    
+    Args:
+        src: Readable binary file object
+        dst: Writable binary file object
+        password (str): Encryption password
+        salt (str): Hex salt
+        iterations (int): PBKDF2 iterations
+        nonce (str): Hex nonce prefix from generate_nonce(), stored in metadata
+        chunk_size (int): Plaintext bytes per sealed chunk
+        kdf (str): Key derivation function (see derive_key)
+        kdf_params (dict): KDF parameter overrides
+        workers (int): Threads sealing chunks in parallel
+    """
+    aead = AESGCM(derive_key(password, salt, iterations, kdf, kdf_params))
+    prefix = bytes.fromhex(nonce)
+    
+    def plain_chunks():
+        chunks = _read_ahead(src, chunk_size)
+        try:
+            counter = 0
+            chunk = next(chunks)
+            while True:
+                following = next(chunks) if len(chunk) == chunk_size else b''
+                last = not following
+                yield aead.encrypt, _gcm_nonce(prefix, counter, last), chunk, None
+                if last:
+                    return
+                chunk = following
+                counter += 1
+        finally:
+            chunks.close()
+    
+    _write_ordered(dst, plain_chunks(), workers)
+
+
+def gcm_decrypt_stream(src, dst, password, salt, iterations=100000, nonce=None, chunk_size=GCM_CHUNK_SIZE,
+                       kdf=KDF_PBKDF2, kdf_params=None, workers=1):
+    """
+    Decrypt and authenticate a stream written by gcm_encrypt_stream
+    
+    Chunks are sealed independently, so with workers > 1 they are opened on a
+    thread pool and written back in order.
+    
+    Raises:
+        ValueError: Wrong password, damaged or truncated archive
+    """
+    aead = AESGCM(derive_key(password, salt, iterations, kdf, kdf_params))
+    prefix = bytes.fromhex(nonce)
+    sealed_size = chunk_size + GCM_TAG_SIZE
+    
+    def open_chunk(counter, chunk, last):
+        if len(chunk) < GCM_TAG_SIZE:
+            raise ValueError("Encrypted stream is truncated")
+        try:
+            return aead.decrypt(_gcm_nonce(prefix, counter, last), chunk, None)
+        except InvalidTag:
+            raise ValueError(f"Authentication failed at chunk {counter} - wrong password or damaged archive") from None
+    
+    def sealed_chunks():
+        chunks = _read_ahead(src, sealed_size)
+        try:
+            counter = 0
+            chunk = next(chunks)
+            while True:
+                following = next(chunks) if len(chunk) == sealed_size else b''
+                last = not following
+                yield open_chunk, counter, chunk, last
+                if last:
+                    return
+                chunk = following
+                counter += 1
+        finally:
+            chunks.close()
+    
+    _write_ordered(dst, sealed_chunks(), workers)
+
+
+def save_metadata(output_path, salt, iterations, algorithm=DEFAULT_CIPHER, nonce=None,
+                  kdf=KDF_PBKDF2, kdf_params=None):
     """
     Save encryption metadata to .enc file
     
@@ -166,6 +712,10 @@ def save_metadata(output_path, salt, iterations):
         output_path (str): Base path for the encrypted archive
         salt (str): Hex salt
         iterations (int): PBKDF2 iterations
+        algorithm (str): Cipher used for the archive
+        nonce (str): Hex GCM nonce prefix (GCM only)
+        kdf (str): Key derivation function (see derive_key)
+        kdf_params (dict): KDF parameter overrides (stored merged with the defaults)
     
     Returns:
         str: Path to metadata file
@@ -175,12 +725,22 @@ def save_metadata(output_path, salt, iterations):
     with open(metadata_file, 'w') as f:
         f.write(f"salt={salt}\n")
         f.write(f"iterations={iterations}\n")
-        f.write(f"algorithm=AES-256-CBC\n")
-        f.write(f"kdf=PBKDF2-SHA256\n")
+        f.write(f"algorithm={algorithm.upper()}\n")
+        f.write(f"kdf={KDF_LABELS[kdf]}\n")
+        if kdf in DEFAULT_KDF_PARAMS:
+            f.write(f"kdf_params={format_kdf_params({**DEFAULT_KDF_PARAMS[kdf], **(kdf_params or {})})}\n")
+        if nonce:
+            f.write(f"nonce={nonce}\n")
+            f.write(f"chunk_size={GCM_CHUNK_SIZE}\n")
     
     return metadata_file
 
 
+# Archive suffixes stripped from a path to find its metadata, only at the end
+# of the path (a directory named foo.enc/ is left alone)
+ARCHIVE_SUFFIX_RE = re.compile(r'(?:\.tar\.(?:gz|bz2|zst))?(?:\.enc)?(?:\.part_\*)?$')
+
+
 def load_metadata(archive_path):
     """
     Load encryption metadata from .enc file
@@ -189,10 +749,12 @@ def load_metadata(archive_path):
         archive_path (str): Path to encrypted archive or pattern
     
     Returns:
-        dict: {'salt': str, 'iterations': int} or None if not found
+        dict: {'salt': str, 'iterations': int, 'algorithm': str, 'nonce': str|None,
+               'chunk_size': int, 'kdf': str, 'kdf_params': dict|None} or None if not found.
+              Metadata without an algorithm line predates CTR and reports AES-256-CBC.
     """
     # Try to find .enc file
-    base_path = archive_path.replace('.part_*', '').replace('.tar.gz.enc', '').replace('.tar.bz2.enc', '').replace('.enc', '')
+    base_path = ARCHIVE_SUFFIX_RE.sub('', archive_path)
     metadata_file = f"{base_path}.enc"
     
     if not os.path.exists(metadata_file):
@@ -205,22 +767,24 @@ def load_metadata(archive_path):
         else:
             return None
     
-    salt = None
-    iterations = 100000
+    kdf_names = {label.upper(): name for name, label in KDF_LABELS.items()}
     
     try:
         with open(metadata_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('salt='):
-                    salt = line.split('=', 1)[1]
-                elif line.startswith('iterations='):
-                    iterations = int(line.split('=', 1)[1])
+            fields = dict(line.strip().partition('=')[::2] for line in f.read().splitlines() if '=' in line)
+        salt = fields.get('salt')
+        iterations = int(fields.get('iterations', 100000))
+        algorithm = fields.get('algorithm', LEGACY_CIPHER).upper()
+        nonce = fields.get('nonce')
+        chunk_size = int(fields.get('chunk_size', GCM_CHUNK_SIZE))
+        kdf = kdf_names.get(fields.get('kdf', '').upper(), KDF_PBKDF2)
+        kdf_params = parse_kdf_params(fields['kdf_params']) if 'kdf_params' in fields else None
     except Exception as e:
         print(f"⚠️  Warning: Could not read metadata file: {e}")
         return None
     
-    return {'salt': salt, 'iterations': iterations}
+    return {'salt': salt, 'iterations': iterations, 'algorithm': algorithm,
+            'nonce': nonce, 'chunk_size': chunk_size, 'kdf': kdf, 'kdf_params': kdf_params}
 
 
 def get_password(prompt="🔐 Enter password: ", confirm=False):
@@ -272,13 +836,28 @@ if __name__ == '__main__':
     print(f"🔐 Encrypted to: {encrypted_file}")
     print(f"   Salt: {salt}")
     
-    # Save metadata
-    metadata_file = save_metadata(test_file, salt, 100000)
+    # Save metadata (next to a separate base, so it does not overwrite the .enc output above)
+    metadata_base = "/tmp/test_crypto_archive"
+    metadata_file = save_metadata(metadata_base, salt, 100000, DEFAULT_CIPHER, kdf=KDF_PBKDF2)
     print(f"💾 Saved metadata: {metadata_file}")
     
     # Load metadata
-    loaded_salt, loaded_iterations = load_metadata(test_file)
-    print(f"📖 Loaded metadata: salt={loaded_salt}, iterations={loaded_iterations}")
+    meta = load_metadata(metadata_base)
+    print(f"📖 Loaded metadata: salt={meta['salt']}, iterations={meta['iterations']}, "
+          f"algorithm={meta['algorithm']}, kdf={KDF_LABELS[meta['kdf']]}")
+    if (meta['salt'], meta['iterations'], meta['algorithm'], meta['kdf']) != (salt, 100000, DEFAULT_CIPHER, KDF_PBKDF2):
+        print("❌ Metadata round-trip FAILED!")
+        sys.exit(1)
+    
+    # GCM + scrypt metadata carries the nonce and the merged KDF parameters
+    nonce = generate_nonce()
+    save_metadata(metadata_base, salt, 100000, GCM_CIPHER, nonce, KDF_SCRYPT, {'n': 2**12})
+    meta = load_metadata(metadata_base)
+    if (meta['algorithm'], meta['nonce'], meta['kdf'], meta['kdf_params']) != (
+            GCM_CIPHER, nonce, KDF_SCRYPT, {**DEFAULT_KDF_PARAMS[KDF_SCRYPT], 'n': 2**12}):
+        print("❌ GCM/scrypt metadata round-trip FAILED!")
+        sys.exit(1)
+    print(f"📖 GCM/scrypt metadata: nonce={meta['nonce']}, kdf_params={format_kdf_params(meta['kdf_params'])}")
     
     # Decrypt
     decrypt_file(encrypted_file, decrypted_file, password, salt)
@@ -6,13 +6,11 @@ Provides methods to authenticate, create folders, upload/download files in strea
 
 import os
 import io
-import threading
-import time
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
+from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload, MediaUpload
 from googleapiclient.errors import HttpError
 
 # Scopes required for Drive file operations
@@ -169,6 +167,9 @@ def get_or_create_folder_path(service, folder_path, parent_id=None):
     Get or create a nested folder path (e.g., "Backups/2025/backup_123").
     Creates intermediate folders as needed.
     
+    Existing folders for every segment are fetched with one files.list call
+    (instead of one search per segment), then only the missing tail is created.
+    
     Args:
         service: Authenticated Drive service
         folder_path (str): Folder path (e.g., "Backups/2025/backup_123")
@@ -178,22 +179,137 @@ def get_or_create_folder_path(service, folder_path, parent_id=None):
         str: ID of the final folder in the path
     """
     path_parts = folder_path.strip('/').split('/')
-    current_parent_id = parent_id
     
-    for folder_name in path_parts:
-        current_parent_id = get_or_create_folder(service, folder_name, current_parent_id)
+    try:
+        names = ' or '.join(f"name='{_quote(name)}'" for name in dict.fromkeys(path_parts))
+        query = f"({names}) and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        
+        print(f"🔍 Searching for folder path: {folder_path}")
+        folders, page_token = [], None
+        while True:
+            results = service.files().list(
+                q=query,
+                spaces='drive',
+                fields='nextPageToken, files(id, name, parents)',
+                pageSize=1000,
+                pageToken=page_token
+            ).execute()
+            folders.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+    except HttpError as error:
+        print(f"❌ Error searching for folder: {error}")
+        raise
     
+    # Walk the path through the fetched folders; without a starting parent the
+    # first segment matches anywhere, as find_folder does
+    current_parent_id = parent_id
+    for depth, folder_name in enumerate(path_parts):
+        match = next((f['id'] for f in folders if f['name'] == folder_name and
+                      (current_parent_id is None or current_parent_id in f.get('parents', []))), None)
+        if match is None:
+            for missing in path_parts[depth:]:
+                current_parent_id = create_folder(service, missing, current_parent_id)
+            return current_parent_id
+        current_parent_id = match
+    
+    print(f"✅ Found folder path!")
+    print(f"   ID: {current_parent_id}")
     return current_parent_id
 
 
+def _quote(value):
+    """Escape a value for a single-quoted Drive query string"""
+    return value.replace('\\', '\\\\').replace("'", "\\'")
+
+
+class PipeMediaUpload(MediaUpload):
+    """
+    Resumable upload body read straight from a pipe, at most `limit` bytes of it.
+    
+    MediaIoBaseUpload needs a seekable file to learn its size, so a pipe had to
+    be copied into memory first. This keeps only the chunk being sent plus one
+    chunk read ahead: the read-ahead tells when the stream ends (so the last
+    request carries the total size), and the current chunk is kept for
+    retries and for partially accepted chunks.
+    
+    Args:
+        stream: Readable binary stream (e.g. a subprocess stdout)
+        limit (int): Maximum bytes to take from the stream for this file
+        mimetype (str): MIME type of the file
+        chunksize (int): Bytes per request, a multiple of 256 KB
+    """
+    
+    def __init__(self, stream, limit, mimetype='application/octet-stream', chunksize=8 * 1024 * 1024):
+        super().__init__()
+        self._stream = stream
+        self._remaining = limit
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._eof = False
+        self.bytes_read = 0
+        self._begin = 0
+        self._chunk = self._read()
+        self._ahead = self._read()
+    
+    def _read(self):
+        """Next chunk from the stream (short only at the end or at limit)"""
+        pieces, size = [], 0
+        while not self._eof and size < self._chunksize:
+            piece = self._stream.read(min(self._chunksize - size, self._remaining))
+            if not piece:
+                self._eof = True
+                break
+            pieces.append(piece)
+            size += len(piece)
+            self._remaining -= len(piece)
+            if not self._remaining:
+                self._eof = True
+        self.bytes_read += size
+        return b''.join(pieces)
+    
+    def chunksize(self):
+        return self._chunksize
+    
+    def mimetype(self):
+        return self._mimetype
+    
+    def size(self):
+        """Total size once the end has been read ahead, else None (sent as '*')"""
+        return self.bytes_read if self._eof else None
+    
+    def resumable(self):
+        return True
+    
+    def getbytes(self, begin, length):
+        """Bytes from offset begin; offsets before the current chunk can no longer be served"""
+        if begin < self._begin:
+            raise ValueError(f"Cannot rewind pipe upload to byte {begin} (at {self._begin})")
+        while begin >= self._begin + len(self._chunk) and self._chunk:
+            self._begin += len(self._chunk)
+            self._chunk, self._ahead = self._ahead, self._read()
+        offset = begin - self._begin
+        data = self._chunk[offset:offset + length]
+        if len(data) < length and self._ahead:
+            data += self._ahead[:length - len(data)]
+        return data
+    
+    def has_stream(self):
+        return False
+    
+    def to_json(self):
+        raise NotImplementedError("A pipe upload cannot be serialized")
+
+
 def upload_file_streaming(service, file_stream, filename, folder_id=None, mime_type='application/octet-stream', chunk_size_mb=10):
     """
     Upload a file to Google Drive using streaming (resumable upload).
-    Shows progress in a separate thread.
+    Shows progress after each uploaded chunk.
     
     Args:
         service: Authenticated Drive service
-        file_stream: File-like object (readable stream)
+        file_stream: Seekable file-like object, or a PipeMediaUpload for pipes
         filename (str): Name for the file in Drive
         folder_id (str, optional): Parent folder ID
         mime_type (str): MIME type of the file
@@ -210,16 +326,19 @@ def upload_file_streaming(service, file_stream, filename, folder_id=None, mime_t
         
         chunk_size = chunk_size_mb * 1024 * 1024  # Convert to bytes
         
+        if isinstance(file_stream, MediaUpload):
+            media = file_stream
+        else:
+            media = MediaIoBaseUpload(
+                file_stream,
+                mimetype=mime_type,
+                chunksize=chunk_size,
+                resumable=True
+            )
+        
         print(f"📤 Uploading file: {filename}")
         print(f"   Folder ID: {folder_id or 'Root'}")
-        print(f"   Chunk size: {chunk_size_mb} MB")
-        
-        media = MediaIoBaseUpload(
-            file_stream,
-            mimetype=mime_type,
-            chunksize=chunk_size,
-            resumable=True
-        )
+        print(f"   Chunk size: {media.chunksize() / (1024**2):.0f} MB")
         
         request = service.files().create(
             body=file_metadata,
@@ -227,42 +346,13 @@ def upload_file_streaming(service, file_stream, filename, folder_id=None, mime_t
             fields='id, name, size, webViewLink'
         )
         
-        # Shared state for progress tracking
-        progress_data = {'progress': 0, 'done': False}
-        progress_lock = threading.Lock()
-        
-        def progress_monitor():
-            """Monitor and display upload progress in separate thread"""
-            while True:
-                with progress_lock:
-                    current_progress = progress_data['progress']
-                    is_done = progress_data['done']
-                
-                if is_done:
-                    break
-                
-                print(f"   📊 Progress: {current_progress}%", end='\r', flush=True)
-                time.sleep(0.1)  # Update every 100ms
-        
-        # Start progress monitoring thread
-        progress_thread = threading.Thread(target=progress_monitor, daemon=True)
-        progress_thread.start()
-        
-        # Upload with progress tracking
+        # Upload with progress tracking (each chunk is one request, so
+        # printing after it is as often as the figure can change)
         response = None
         while response is None:
             status, response = request.next_chunk()
             if status:
-                with progress_lock:
-                    progress_data['progress'] = int(status.progress() * 100)
-        
-        # Signal completion to progress thread
-        with progress_lock:
-            progress_data['done'] = True
-            progress_data['progress'] = 100
-        
-        # Wait for progress thread to finish
-        progress_thread.join(timeout=1.0)
+                print(f"   📊 Progress: {int(status.progress() * 100)}%", end='\r', flush=True)
         
         print()  # New line after progress
         print(f"✅ Upload complete!")
@@ -274,9 +364,6 @@ def upload_file_streaming(service, file_stream, filename, folder_id=None, mime_t
         return response.get('id')
     
     except HttpError as error:
-        # Ensure progress thread is stopped
-        with progress_lock:
-            progress_data['done'] = True
         print(f"❌ Error uploading file: {error}")
         raise
 
@@ -327,7 +414,7 @@ def download_file_streaming(service, file_id, output_stream):
 
 def list_files(service, folder_id=None, query=None):
     """
-    List files in Google Drive.
+    List files in Google Drive (all pages, 1000 files per request).
     
     Args:
         service: Authenticated Drive service
@@ -335,7 +422,7 @@ def list_files(service, folder_id=None, query=None):
         query (str, optional): Additional query parameters
     
     Returns:
-        list: List of file dictionaries
+        list: File dictionaries (id, name, size, mimeType)
     """
     try:
         base_query = "trashed=false"
@@ -347,14 +434,19 @@ def list_files(service, folder_id=None, query=None):
             base_query += f" and {query}"
         
         print(f"📋 Listing files...")
-        results = service.files().list(
-            q=base_query,
-            spaces='drive',
-            fields='files(id, name, size, mimeType, modifiedTime, webViewLink)',
-            pageSize=100
-        ).execute()
-        
-        files = results.get('files', [])
+        files, page_token = [], None
+        while True:
+            results = service.files().list(
+                q=base_query,
+                spaces='drive',
+                fields='nextPageToken, files(id, name, size, mimeType)',
+                pageSize=1000,
+                pageToken=page_token
+            ).execute()
+            files.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
         
         print(f"✅ Found {len(files)} file(s)")
         for i, file in enumerate(files, 1):
@@ -400,6 +492,39 @@ def delete_file(service, file_id):
         raise
 
 
+def delete_files(service, file_ids):
+    """
+    Delete several files from Google Drive with batch requests.
+    
+    Up to 100 deletes go in one HTTP round-trip (the Drive batch limit), and
+    no per-file metadata lookup is made.
+    
+    Args:
+        service: Authenticated Drive service
+        file_ids (list): IDs of the files to delete
+    
+    Returns:
+        list: IDs that could not be deleted
+    """
+    failed = []
+    
+    def on_done(request_id, response, exception):
+        if exception is not None:
+            print(f"❌ Error deleting file {request_id}: {exception}")
+            failed.append(request_id)
+    
+    file_ids = list(file_ids)
+    print(f"🗑️  Deleting {len(file_ids)} file(s)")
+    for start in range(0, len(file_ids), 100):
+        batch = service.new_batch_http_request(callback=on_done)
+        for file_id in file_ids[start:start + 100]:
+            batch.add(service.files().delete(fileId=file_id), request_id=file_id)
+        batch.execute()
+    
+    print(f"✅ Deleted {len(file_ids) - len(failed)} file(s)")
+    return failed
+
+
 def main():
     """Example usage of Google Drive helper functions."""
     print("=== Google Drive Helper - Example Usage ===\n")
@@ -96,7 +96,8 @@ def test_metadata():
             # Load metadata
             loaded = crypto.load_metadata(base_path)
             
-            if loaded['salt'] == salt_hex and loaded['iterations'] == iterations:
+            if (loaded['salt'] == salt_hex and loaded['iterations'] == iterations
+                    and loaded['algorithm'] == crypto.DEFAULT_CIPHER):
                 print(f"   ✅ Metadata loaded correctly")
                 print(f"      Salt: {loaded['salt'][:16]}...")
                 print(f"      Iterations: {loaded['iterations']}")
@@ -164,6 +165,270 @@ def test_file_encryption():
             traceback.print_exc()
             return False
 
+def test_pipeline_roundtrip():
+    """Test encrypt/decrypt pipeline commands with the password passed by fd"""
+    print("\n🔍 Testing pipeline round trip (password via fd)...")
+    import subprocess
+    password = "TestPassword123!"
+    salt_hex = crypto.generate_salt()
+    data = os.urandom(100000)
+    
+    try:
+        results = {}
+        for algorithm in crypto.OPENSSL_CIPHERS:
+            fd = crypto.password_pipe(password)
+            cmd = crypto.encrypt_pipeline_cmd(password, salt_hex, 10000, algorithm, pass_fd=fd)
+            if password in cmd:
+                print(f"   ❌ Password visible in command line")
+                return False
+            encrypted = subprocess.run(cmd.split(), input=data, capture_output=True,
+                                       pass_fds=(fd,), check=True).stdout
+            os.close(fd)
+            
+            fd = crypto.password_pipe(password)
+            cmd = crypto.decrypt_pipeline_cmd(password, salt_hex, 10000, algorithm, pass_fd=fd)
+            decrypted = subprocess.run(cmd.split(), input=encrypted, capture_output=True,
+                                       pass_fds=(fd,), check=True).stdout
+            os.close(fd)
+            results[algorithm] = decrypted == data
+            print(f"   {'✅' if results[algorithm] else '❌'} {algorithm}: {len(encrypted)} bytes encrypted")
+        return all(results.values())
+    except Exception as e:
+        print(f"   ❌ Pipeline round trip failed: {e}")
+        return False
+
+def test_ctr_fresh_salt():
+    """Test two CTR backups with the same password and configured salt get different keystreams"""
+    print("\n🔍 Testing CTR salt per archive...")
+    import subprocess
+    password = "TestPassword123!"
+    configured_salt = "0123456789abcdef0123456789abcdef"
+    zeros = bytes(4096)  # Ciphertext of zeros is the keystream itself
+    
+    try:
+        keystreams = []
+        for _ in range(2):
+            salt_hex = crypto.new_archive_salt(crypto.DEFAULT_CIPHER, configured_salt)
+            fd = crypto.password_pipe(password)
+            cmd = crypto.encrypt_pipeline_cmd(password, salt_hex, 10000, pass_fd=fd)
+            keystreams.append(subprocess.run(cmd.split(), input=zeros, capture_output=True,
+                                             pass_fds=(fd,), check=True).stdout)
+            os.close(fd)
+        if keystreams[0] == keystreams[1]:
+            print(f"   ❌ Two CTR archives share a keystream")
+            return False
+        print(f"   ✅ Each CTR archive gets its own salt and keystream")
+        
+        if crypto.new_archive_salt(crypto.GCM_CIPHER, configured_salt) != configured_salt:
+            print(f"   ❌ GCM did not keep the configured salt")
+            return False
+        print(f"   ✅ GCM keeps the configured salt (fresh nonce per archive)")
+        return True
+    except Exception as e:
+        print(f"   ❌ CTR salt test failed: {e}")
+        return False
+
+def test_stream_cipher():
+    """Test in-process AES-CTR matches openssl byte for byte"""
+    print("\n🔍 Testing in-process stream cipher...")
+    if not crypto.HAS_CRYPTOGRAPHY:
+        print("   ⏭️  cryptography not installed - openssl is used instead (skipped)")
+        return True
+    import io
+    import subprocess
+    password = "TestPassword123!"
+    salt_hex = crypto.generate_salt()
+    data = os.urandom(3 * 1024 * 1024 + 3)  # Not a multiple of the chunk or block size
+    
+    try:
+        fd = crypto.password_pipe(password)
+        cmd = crypto.encrypt_pipeline_cmd(password, salt_hex, 10000, pass_fd=fd)
+        expected = subprocess.run(cmd.split(), input=data, capture_output=True,
+                                  pass_fds=(fd,), check=True).stdout
+        os.close(fd)
+        
+        for workers in (1, 3):
+            encrypted = io.BytesIO()
+            crypto.encrypt_stream(io.BytesIO(data), encrypted, password, salt_hex, 10000, workers=workers)
+            if encrypted.getvalue() != expected:
+                print(f"   ❌ Ciphertext differs from openssl ({workers} worker(s))")
+                return False
+        print(f"   ✅ Ciphertext matches openssl ({len(expected)} bytes, serial and parallel)")
+        
+        # Two archives from one password and configured salt must not share a keystream
+        keystreams = set()
+        for _ in range(2):
+            encrypted = io.BytesIO()
+            crypto.encrypt_stream(io.BytesIO(bytes(4096)), encrypted, password,
+                                  crypto.new_archive_salt(crypto.DEFAULT_CIPHER, salt_hex), 10000, workers=3)
+            keystreams.add(encrypted.getvalue())
+        if len(keystreams) != 2:
+            print(f"   ❌ Two in-process CTR archives share a keystream")
+            return False
+        print(f"   ✅ In-process CTR archives get distinct keystreams")
+        
+        for workers in (1, 3):
+            decrypted = io.BytesIO()
+            crypto.decrypt_stream(io.BytesIO(expected), decrypted, password, salt_hex, 10000, workers=workers)
+            if decrypted.getvalue() != data:
+                print(f"   ❌ Decrypted content doesn't match original ({workers} worker(s))")
+                return False
+        print(f"   ✅ Decryption successful - content matches (serial and parallel)!")
+        
+        # Legacy CBC runs in-process too and must still match openssl (padding included)
+        fd = crypto.password_pipe(password)
+        cmd = crypto.encrypt_pipeline_cmd(password, salt_hex, 10000, crypto.LEGACY_CIPHER, pass_fd=fd)
+        expected = subprocess.run(cmd.split(), input=data, capture_output=True,
+                                  pass_fds=(fd,), check=True).stdout
+        os.close(fd)
+        encrypted = io.BytesIO()
+        crypto.encrypt_stream(io.BytesIO(data), encrypted, password, salt_hex, 10000,
+                              algorithm=crypto.LEGACY_CIPHER)
+        decrypted = io.BytesIO()
+        crypto.decrypt_stream(io.BytesIO(expected), decrypted, password, salt_hex, 10000,
+                              algorithm=crypto.LEGACY_CIPHER)
+        if encrypted.getvalue() != expected or decrypted.getvalue() != data:
+            print(f"   ❌ In-process CBC doesn't match openssl")
+            return False
+        print(f"   ✅ In-process CBC matches openssl")
+        return True
+    except Exception as e:
+        print(f"   ❌ Stream cipher test failed: {e}")
+        return False
+
+def test_gcm_stream():
+    """Test AES-256-GCM chunked round trip and tamper detection"""
+    print("\n🔍 Testing AES-256-GCM stream...")
+    if not crypto.HAS_CRYPTOGRAPHY:
+        print("   ⏭️  cryptography not installed - GCM unavailable (skipped)")
+        return True
+    import io
+    password = "TestPassword123!"
+    salt_hex = crypto.generate_salt()
+    nonce = crypto.generate_nonce()
+    data = os.urandom(3 * 1024 * 1024 + 17)  # Several chunks plus a partial one
+    
+    try:
+        encrypted = io.BytesIO()
+        crypto.gcm_encrypt_stream(io.BytesIO(data), encrypted, password, salt_hex, 10000, nonce)
+        for workers in (1, 3):
+            decrypted = io.BytesIO()
+            crypto.gcm_decrypt_stream(io.BytesIO(encrypted.getvalue()), decrypted, password, salt_hex, 10000, nonce,
+                                      workers=workers)
+            if decrypted.getvalue() != data:
+                print(f"   ❌ Decrypted content doesn't match original ({workers} worker(s))")
+                return False
+        print(f"   ✅ Round trip successful ({len(encrypted.getvalue())} bytes encrypted)")
+        
+        ciphertext = encrypted.getvalue()
+        tampered = bytearray(ciphertext)
+        tampered[len(tampered) // 2] ^= 1
+        truncated = ciphertext[:crypto.GCM_CHUNK_SIZE + crypto.GCM_TAG_SIZE]
+        for name, blob in (("tampered", bytes(tampered)), ("truncated", truncated)):
+            try:
+                crypto.gcm_decrypt_stream(io.BytesIO(blob), io.BytesIO(), password, salt_hex, 10000, nonce, workers=2)
+            except Exception:
+                print(f"   ✅ {name.capitalize()} archive rejected")
+                continue
+            print(f"   ❌ {name.capitalize()} archive decrypted without error")
+            return False
+        return True
+    except Exception as e:
+        print(f"   ❌ GCM stream test failed: {e}")
+        return False
+
+def test_kdf():
+    """Test scrypt key derivation and KDF metadata"""
+    print("\n🔍 Testing KDF selection...")
+    password = "TestPassword123!"
+    salt_hex = crypto.generate_salt()
+    
+    try:
+        params = crypto.parse_kdf_params("n=2**12,r=8,p=1")
+        scrypt_key = crypto.derive_key(password, salt_hex, kdf=crypto.KDF_SCRYPT, kdf_params=params)
+        pbkdf2_key = crypto.derive_key(password, salt_hex, iterations=10000)
+        if len(scrypt_key) != 32 or scrypt_key == pbkdf2_key:
+            print(f"   ❌ Unexpected scrypt key")
+            return False
+        print(f"   ✅ scrypt key derived ({crypto.format_kdf_params(params)})")
+        
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base_path = os.path.join(tmpdir, "test_archive")
+            crypto.save_metadata(base_path, salt_hex, 10000, crypto.GCM_CIPHER, crypto.generate_nonce(),
+                                 crypto.KDF_SCRYPT, params)
+            loaded = crypto.load_metadata(base_path)
+        if loaded['kdf'] != crypto.KDF_SCRYPT or loaded['kdf_params'] != params:
+            print(f"   ❌ KDF metadata mismatch: {loaded['kdf']} {loaded['kdf_params']}")
+            return False
+        print(f"   ✅ KDF metadata round trip")
+        return True
+    except Exception as e:
+        print(f"   ❌ KDF test failed: {e}")
+        return False
+
+def test_onedrive_pipe():
+    """Test OneDrive part uploads read a pipe with counted reads (no seeking)"""
+    print("\n🔍 Testing OneDrive upload from a pipe...")
+    import threading
+    import archivedir_fast
+    
+    class Response:
+        def __init__(self, body=None):
+            self.body = body
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return self.body
+    
+    class FakeSession:
+        """Records upload sessions and chunk PUTs in place of requests.Session"""
+        def __init__(self):
+            self.files = {}
+        def post(self, url, headers=None):
+            name = url.rsplit(':/', 1)[0].rsplit('/', 1)[1]
+            self.files[name] = []
+            return Response({'uploadUrl': name})
+        def put(self, url, data=None, headers=None):
+            self.files[url].append((headers['Content-Range'], data))
+            return Response()
+    
+    data = os.urandom(5 * 1024 * 1024 + 123)
+    read_fd, write_fd = os.pipe()
+    def writer():
+        with os.fdopen(write_fd, 'wb') as w:
+            w.write(data)
+    thread = threading.Thread(target=writer)
+    thread.start()
+    
+    try:
+        http = FakeSession()
+        with os.fdopen(read_fd, 'rb') as stream, tempfile.TemporaryDirectory() as spool_dir:
+            parts, total = archivedir_fast.upload_onedrive_parts(stream, http, 'token', 'backups', 'src.tar.zst',
+                                                                 2 * 1024 * 1024, spool_dir=spool_dir,
+                                                                 chunk_size=320 * 1024)
+        thread.join()
+        if parts != 3 or total != len(data) or sorted(http.files) != [f"src.part_{i:03d}.tar.zst" for i in range(3)]:
+            print(f"   ❌ Unexpected parts: {sorted(http.files)} ({total} bytes)")
+            return False
+        joined = b''
+        for name in sorted(http.files):
+            size = sum(len(chunk) for _, chunk in http.files[name])
+            offset = 0
+            for content_range, chunk in http.files[name]:
+                if content_range != f"bytes {offset}-{offset + len(chunk) - 1}/{size}":
+                    print(f"   ❌ Bad Content-Range for {name}: {content_range}")
+                    return False
+                offset += len(chunk)
+            joined += b''.join(chunk for _, chunk in http.files[name])
+        if joined != data:
+            print(f"   ❌ Uploaded parts don't match the piped data")
+            return False
+        print(f"   ✅ {parts} parts uploaded from a pipe with correct Content-Range")
+        return True
+    except Exception as e:
+        print(f"   ❌ OneDrive pipe test failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("=" * 60)
@@ -177,6 +442,12 @@ def main():
         ("Pipeline Commands", test_pipeline_commands),
         ("Metadata Save/Load", test_metadata),
         ("File Encryption/Decryption", test_file_encryption),
+        ("Pipeline Round Trip", test_pipeline_roundtrip),
+        ("CTR Salt Per Archive", test_ctr_fresh_salt),
+        ("In-process Stream Cipher", test_stream_cipher),
+        ("AES-256-GCM Stream", test_gcm_stream),
+        ("KDF Selection", test_kdf),
+        ("OneDrive Upload From Pipe", test_onedrive_pipe),
     ]
     
     results = []